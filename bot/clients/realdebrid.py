@@ -15,6 +15,11 @@ from typing import List, Dict, Any, Optional
 logger = logging.getLogger(__name__)
 
 from bot.config import RD_ACCESS_TOKEN, RD_API_BASE
+from bot.utils.http import get_session
+from bot.utils.ratelimit import TokenBucket
+
+# RD allows 250 requests/minute; 4/s sustained plus a burst of 10 stays under it
+_rd_bucket = TokenBucket(rate=4.0, capacity=10)
 
 
 class RealDebridNotConfigured(RuntimeError):
@@ -48,7 +53,8 @@ class RDClient:
         
         try:
             logger.debug(f"RD Request: {method} {url}")
-            resp = requests.request(method, url, headers=headers, **kwargs)
+            _rd_bucket.take()
+            resp = get_session().request(method, url, headers=headers, **kwargs)
         except requests.RequestException as exc:
             raise RDAPIError(f"network error: {exc}") from exc
             
@@ -125,9 +131,12 @@ class RDClient:
         """Add a magnet to Real-Debrid torrents and return the created resource."""
         return self._request("POST", "/torrents/addMagnet", data={"magnet": magnet})
 
-    def list_torrents(self, page: int = 1, limit: int = 50) -> List[Dict[str, Any]]:
-        """List user torrents."""
-        return self._request("GET", "/torrents", params={"page": page, "limit": limit}) or []
+    def list_torrents(self, page: int = 1, limit: int = 50, active_only: bool = False) -> List[Dict[str, Any]]:
+        """List user torrents. `active_only` filters server-side to unfinished torrents."""
+        params = {"page": page, "limit": limit}
+        if active_only:
+            params["filter"] = "active"
+        return self._request("GET", "/torrents", params=params) or []
     
     def get_torrent_info(self, torrent_id: str) -> Dict[str, Any]:
         """Get details about a specific torrent."""
@@ -26,7 +26,9 @@ class SeedboxClient:
     def __init__(self, url: str = None, user: str = None, password: str = None, rpc_url: str = None):
         self.user = user or RUTORRENT_USER
         self.password = password or RUTORRENT_PASS
-        self._lock = threading.Lock()
+        # ServerProxy isn't thread-safe; one per thread lets concurrent handlers
+        # talk to rTorrent in parallel instead of queueing behind a global lock
+        self._local = threading.local()
         
         # Priority: explicit rpc_url -> env SEEDBOX_RPC_URL -> derived from RUTORRENT_URL
         final_rpc_url = rpc_url or SEEDBOX_RPC_URL
@@ -70,20 +72,25 @@ class SeedboxClient:
             self.rpc_url = f"https://{rpc_user}:{self.password}@{final_rpc_url}"
 
         logger.info(f"Initialized Seedbox client at {self.rpc_url.replace(self.password, '********')}")
-        # Default timeout for XML-RPC calls
-        self.server = xmlrpc.client.ServerProxy(self.rpc_url, context=None)
+
+    @property
+    def server(self) -> xmlrpc.client.ServerProxy:
+        """XML-RPC proxy for the calling thread."""
+        proxy = getattr(self._local, "server", None)
+        if proxy is None:
+            proxy = self._local.server = xmlrpc.client.ServerProxy(self.rpc_url, context=None)
+        return proxy
 
     def _call(self, method: str, *args) -> Any:
-        with self._lock:
-            try:
-                logger.debug(f"Calling XML-RPC: {method} with args {args}")
-                return getattr(self.server, method)(*args)
-            except xmlrpc.client.Fault as e:
-                logger.error(f"rTorrent Fault in {method}: {e.faultString}")
-                raise SeedboxCommunicationError(f"rTorrent Fault: {e.faultString} ({e.faultCode})")
-            except Exception as e:
-                logger.error(f"rTorrent connection error in {method}: {e}")
-                raise SeedboxCommunicationError(f"rTorrent connection error: {e}")
+        try:
+            logger.debug(f"Calling XML-RPC: {method} with args {args}")
+            return getattr(self.server, method)(*args)
+        except xmlrpc.client.Fault as e:
+            logger.error(f"rTorrent Fault in {method}: {e.faultString}")
+            raise SeedboxCommunicationError(f"rTorrent Fault: {e.faultString} ({e.faultCode})")
+        except Exception as e:
+            logger.error(f"rTorrent connection error in {method}: {e}")
+            raise SeedboxCommunicationError(f"rTorrent connection error: {e}")
 
     def add_torrent(self, torrent: str) -> Dict[str, Any]:
         """Add torrent by URL/Magnet."""
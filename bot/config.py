@@ -57,7 +57,19 @@ TELEGRAM_API_HASH = get_env_safe("TELEGRAM_API_HASH")
 TELEGRAM_PHONE = get_env_safe("TELEGRAM_PHONE")
 TELEGRAM_SESSION = get_env_safe("TELEGRAM_SESSION")  # String session for Heroku
 TG_UPLOAD_TARGET = get_env_safe("TG_UPLOAD_TARGET") # Optional channel/group ID
+RSS_NOTIFY_CHAT = get_env_safe("RSS_NOTIFY_CHAT")  # Optional chat for background RSS summaries
 REDIS_URL = get_env_safe("REDIS_URL")
+STATE_FILE = get_env_safe("STATE_FILE", "state.json")  # JSON state (jobs go in a .jobs.db beside it) when Redis is unset
+
+# Webhook mode (Heroku web dyno): updates are pushed instead of long-polled.
+# Leave WEBHOOK_URL unset to keep using getUpdates polling.
+WEBHOOK_URL = get_env_safe("WEBHOOK_URL")  # e.g. https://your-app.herokuapp.com
+PORT = int(get_env_safe("PORT", "8443"))
+
+# Comma-separated Telegram user ids allowed to use the bot; empty = anyone
+ALLOWED_USER_IDS = frozenset(
+    int(uid) for uid in (get_env_safe("ALLOWED_USER_IDS") or "").split(",") if uid.strip()
+)
 
 
 
@@ -11,13 +11,15 @@ Handles:
 """
 
 import os
+import queue
 import time
 import threading
-import requests
 import logging
 import stat
 import hashlib
-from typing import List, Optional, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Dict, Any, Tuple
 
 try:
     import paramiko
@@ -32,26 +34,109 @@ from bot.config import (
     DRIVE_DEST,
 )
 from bot.state import get_state
+from bot.utils.http import get_session
 from bot.utils.splitter import split_file
+from bot.utils.subproc import run_tail
+from bot.utils.thumbnailer import generate_thumbnail
 
 logger = logging.getLogger(__name__)
 
 MAX_TG_SIZE = int(os.getenv("MAX_TG_SIZE", str(2 * 1024 * 1024 * 1024)))  # 2GB default
+STATUS_UPDATE_INTERVAL = 0.5  # seconds between coalesced progress writes
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "3"))
+DL_QUEUE_SIZE = 32  # process_item raises queue.Full once this many items are waiting
+FINISHED_TASK_LINGER = 5  # seconds a finished/failed task stays visible in /status
+
+# Fixed worker pool shared by all Downloader instances; items wait in the
+# bounded queue (shown as "queued") instead of each getting its own thread
+_work_queue: "queue.Queue" = queue.Queue(maxsize=DL_QUEUE_SIZE)
+_workers_started = False
+_workers_lock = threading.Lock()
+
+
+def _ensure_workers():
+    global _workers_started
+    with _workers_lock:
+        if _workers_started:
+            return
+        for i in range(MAX_CONCURRENT_DOWNLOADS):
+            threading.Thread(target=_download_worker, name=f"download-{i}", daemon=True).start()
+        _workers_started = True
+
+
+def _download_worker():
+    while True:
+        downloader, args = _work_queue.get()
+        try:
+            downloader._process_item_worker(*args)
+        except Exception as e:
+            logger.error(f"Download worker error: {e}")
+        finally:
+            _work_queue.task_done()
+
+# rclone defaults (4 transfers, 8M chunks) are far below Drive's sweet spot
+RCLONE_TUNING_FLAGS = [
+    "--transfers=8",
+    "--checkers=16",
+    "--drive-upload-cutoff=128M",
+    "--buffer-size=64M",
+    "--use-mmap",
+]
+RCLONE_LARGE_FILE = 4 * 1024 ** 3  # use bigger chunks above this size
+
+THUMB_EXTS = frozenset({".mp4", ".mkv", ".avi", ".mov", ".m4v", ".webm"})
+THUMB_LOOKAHEAD = 2  # thumbnails requested ahead of the file being uploaded
+THUMB_WAIT = 30  # seconds an upload waits for its thumbnail before going without
+# ffmpeg runs here while earlier files are still hashing/uploading
+_thumb_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumb")
+
+
+def build_rclone_cmd(path: str, size: Optional[int] = None) -> List[str]:
+    """Build the `rclone copy` command for uploading `path` to DRIVE_DEST."""
+    chunk = "256M" if size and size > RCLONE_LARGE_FILE else "128M"
+    return ["rclone", "copy", path, DRIVE_DEST, "-P", *RCLONE_TUNING_FLAGS, f"--drive-chunk-size={chunk}"]
+
+
+def list_local_files(root: str) -> List[Tuple[str, int]]:
+    """Recursively list files under `root` as (path, size), statting each once."""
+    files = []
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    files.append((entry.path, entry.stat().st_size))
+    return files
+
+
+def _remove_thumb(fut: Future) -> None:
+    """Done-callback that deletes a generated thumbnail file."""
+    path = None if fut.cancelled() or fut.exception() else fut.result()
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 
+def _discard_thumb(fut: Optional[Future]) -> None:
+    """Drop a thumbnail that won't be used: cancel it or delete it when ready."""
+    if fut is not None:
+        fut.cancel()
+        fut.add_done_callback(_remove_thumb)
 
-def count_sftp_files(sftp, path):
-    """Recursively count files in SFTP directory."""
-    count = 0
+
+def _resolve_thumb(fut: Optional[Future]) -> Optional[str]:
+    """Wait up to THUMB_WAIT for a thumbnail; None if it's late or failed."""
+    if fut is None:
+        return None
     try:
-        for entry in sftp.listdir_attr(path):
-            full_path = f"{path}/{entry.filename}"
-            if stat.S_ISDIR(entry.st_mode):
-                count += count_sftp_files(sftp, full_path)
-            else:
-                count += 1
+        return fut.result(timeout=THUMB_WAIT)
     except Exception as e:
-        logger.error(f"Error counting SFTP files in {path}: {e}")
-    return count
+        logger.warning(f"Uploading without thumbnail: {e!r}")
+        return None
 
 
 def hash_file(filepath: str) -> str:
@@ -67,42 +152,70 @@ def hash_file(filepath: str) -> str:
     return h.hexdigest()
 
 
+@dataclass(slots=True)
+class TaskRecord:
+    """Live state of a single download/upload task."""
+    name: str
+    status: str
+    start_time: float
+    total_files: int = 0
+    uploaded_files: int = 0
+    progress_percent: float = 0.0
+    last_update: float = 0.0
+
+
 class Downloader:
     """Handles downloading and uploading of files."""
 
     def __init__(self, telegram_updater=None):
         self.updater = telegram_updater
         self._lock = threading.Lock()
-        self._active_tasks = {}
+        self._active_tasks: Dict[str, TaskRecord] = {}
 
     def get_active_tasks(self) -> dict:
-        """Return a copy of active tasks for status display."""
+        """Return a snapshot of active tasks (as plain dicts) for status display."""
         with self._lock:
-            return self._active_tasks.copy()
+            records = list(self._active_tasks.items())
+        return {tid: asdict(rec) for tid, rec in records}
 
     def _update_task_status(self, task_id, status, progress=None, uploaded_files=None, total_files=None):
-        """Update task status with optional progress and file count."""
+        """Update task status with optional progress and file count.
+
+        Pure progress ticks with an unchanged status are coalesced to one
+        write per STATUS_UPDATE_INTERVAL; status changes, file counts and
+        the final 100% are always recorded. The coalescing gate is checked
+        without the lock, so per-chunk download ticks and the Telethon
+        callback on the asyncio loop thread only contend for it when they
+        actually write.
+        """
+        now = time.monotonic()
+        rec = self._active_tasks.get(task_id)
+        if rec is None:
+            return
+        if (
+            status == rec.status
+            and total_files is None
+            and (uploaded_files is None or uploaded_files == rec.uploaded_files)
+            and (progress is None or progress < 100)
+            and now - rec.last_update < STATUS_UPDATE_INTERVAL
+        ):
+            return
         with self._lock:
-            if task_id in self._active_tasks:
-                self._active_tasks[task_id]["status"] = status
-                if progress is not None:
-                    self._active_tasks[task_id]["progress_percent"] = progress
-                if uploaded_files is not None:
-                    self._active_tasks[task_id]["uploaded_files"] = uploaded_files
-                if total_files is not None:
-                    self._active_tasks[task_id]["total_files"] = total_files
+            if self._active_tasks.get(task_id) is not rec:
+                return
+            rec.last_update = now
+            rec.status = status
+            if progress is not None:
+                rec.progress_percent = progress
+            if uploaded_files is not None:
+                rec.uploaded_files = uploaded_files
+            if total_files is not None:
+                rec.total_files = total_files
 
     def _register_task(self, task_id, name, status="starting"):
         """Register a new active task."""
         with self._lock:
-            self._active_tasks[task_id] = {
-                "name": name,
-                "status": status,
-                "start_time": time.time(),
-                "total_files": 0,
-                "uploaded_files": 0,
-                "progress_percent": 0.0,
-            }
+            self._active_tasks[task_id] = TaskRecord(name=name, status=status, start_time=time.time())
 
     def _unregister_task(self, task_id):
         """Remove task from active list."""
@@ -110,16 +223,43 @@ class Downloader:
             self._active_tasks.pop(task_id, None)
 
     def process_item(self, url, name, dest="telegram", chat_id=None, size=0):
-        """Main entry point: download and upload a file or folder."""
+        """Main entry point: download and upload a file or folder.
+
+        Never blocks the caller (handler threads, the monitor job): raises
+        queue.Full when DL_QUEUE_SIZE items are already waiting, so the
+        caller can leave the item for a later attempt.
+        """
         task_id = f"{int(time.time())}_{name[:20]}"
         self._register_task(task_id, name, "queued")
 
-        t = threading.Thread(
-            target=self._process_item_worker,
-            args=(task_id, url, name, dest, chat_id, size),
-            daemon=True,
-        )
-        t.start()
+        _ensure_workers()
+        try:
+            _work_queue.put_nowait((self, (task_id, url, name, dest, chat_id, size)))
+        except queue.Full:
+            self._unregister_task(task_id)
+            raise
+
+    @staticmethod
+    def free_slots() -> int:
+        """How many more items process_item can accept right now."""
+        return _work_queue.maxsize - _work_queue.qsize()
+
+    def upload_local_file(self, path, dest="telegram", chat_id=None, name=None):
+        """Upload an already-downloaded file or folder, blocking until done.
+
+        Folders are uploaded file by file through the same path as downloads,
+        including hash-based resume. The upload is shown as an active task.
+        It runs on the caller's thread, not the worker pool, so it does not
+        count against MAX_CONCURRENT_DOWNLOADS; yt-dlp jobs are capped by
+        their own executor instead.
+        """
+        name = name or os.path.basename(path.rstrip(os.sep))
+        task_id = f"{int(time.time())}_{name[:20]}"
+        self._register_task(task_id, name, "uploading")
+        try:
+            self._upload(path, name, dest, chat_id, task_id)
+        finally:
+            self._unregister_task(task_id)
 
     def _process_item_worker(self, task_id, url, name, dest, chat_id, size):
         """Background worker for processing items."""
@@ -144,30 +284,30 @@ class Downloader:
             logger.error(f"❌ Error processing {name}: {e}")
             self._update_task_status(task_id, f"error: {e}")
         finally:
-            time.sleep(5)
-            self._unregister_task(task_id)
+            # Keep the final status visible briefly without holding a worker
+            threading.Timer(FINISHED_TASK_LINGER, self._unregister_task, args=(task_id,)).start()
 
     def _download_http(self, url, dest, task_id, expected_size=0):
         """Download file from HTTP URL with progress tracking."""
         self._update_task_status(task_id, "downloading")
 
         try:
-            r = requests.get(url, stream=True, timeout=30)
-            r.raise_for_status()
+            with get_session().get(url, stream=True, timeout=30) as r:
+                r.raise_for_status()
 
-            total_size = int(r.headers.get("content-length", expected_size))
-            downloaded = 0
+                total_size = int(r.headers.get("content-length", expected_size))
+                downloaded = 0
 
-            with open(dest, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
+                with open(dest, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=8192):
+                        if chunk:
+                            f.write(chunk)
+                            downloaded += len(chunk)
 
-                        # Update progress every 1MB
-                        if total_size > 0 and downloaded % (1024 * 1024) == 0:
-                            progress = (downloaded / total_size) * 100
-                            self._update_task_status(task_id, "downloading", progress=progress)
+                            # Coalesced by _update_task_status
+                            if total_size > 0:
+                                progress = (downloaded / total_size) * 100
+                                self._update_task_status(task_id, "downloading", progress=progress)
 
             logger.info(f"Downloaded {dest} ({downloaded} bytes)")
             return dest
@@ -198,9 +338,7 @@ class Downloader:
             try:
                 attr = sftp.stat(remote_path)
                 if stat.S_ISDIR(attr.st_mode):
-                    total = count_sftp_files(sftp, remote_path)
-                    self._update_task_status(task_id, "downloading", total_files=total, uploaded_files=0)
-                    self._download_sftp_dir(sftp, remote_path, dest, task_id, total, [0])
+                    self._download_sftp_dir(sftp, remote_path, dest, task_id)
                 else:
                     self._update_task_status(task_id, "downloading", total_files=1)
                     sftp.get(remote_path, dest)
@@ -211,28 +349,40 @@ class Downloader:
             ssh.close()
         return dest
 
-    def _download_sftp_dir(self, sftp, remote_path, local_path, task_id, total, counter):
-        """Recursively download directory from SFTP with file counting."""
-        os.makedirs(local_path, exist_ok=True)
+    def _walk_sftp(self, sftp, remote_dir) -> List[Tuple[str, str, Any]]:
+        """List every file under an SFTP directory in one pass.
 
-        try:
+        Returns (remote_path, relative_path, attributes) tuples, so the file
+        count and the download loop share a single set of listdir calls.
+        """
+        files = []
+        stack = [(remote_dir, "")]
+        while stack:
+            remote_path, rel_path = stack.pop()
             for entry in sftp.listdir_attr(remote_path):
                 remote_file = f"{remote_path}/{entry.filename}"
-                local_file = os.path.join(local_path, entry.filename)
-
+                rel_file = os.path.join(rel_path, entry.filename)
                 if stat.S_ISDIR(entry.st_mode):
-                    self._download_sftp_dir(sftp, remote_file, local_file, task_id, total, counter)
+                    stack.append((remote_file, rel_file))
                 else:
-                    sftp.get(remote_file, local_file)
-                    counter[0] += 1
-                    # Update status with file count
-                    self._update_task_status(
-                        task_id, 
-                        f"Downloading (Sftp {counter[0]}/{total} Files)",
-                        uploaded_files=counter[0],
-                        total_files=total
-                    )
-                    logger.debug(f"Downloaded {remote_file} -> {local_file} ({counter[0]}/{total})")
+                    files.append((remote_file, rel_file, entry))
+        return files
+
+    def _download_sftp_dir(self, sftp, remote_path, local_path, task_id):
+        """Download a directory from SFTP with file counting."""
+        try:
+            files = self._walk_sftp(sftp, remote_path)
+            total = len(files)
+            self._update_task_status(task_id, "downloading", total_files=total, uploaded_files=0)
+
+            os.makedirs(local_path, exist_ok=True)
+            for idx, (remote_file, rel_file, _attr) in enumerate(files, 1):
+                local_file = os.path.join(local_path, rel_file)
+                os.makedirs(os.path.dirname(local_file), exist_ok=True)
+                sftp.get(remote_file, local_file)
+                # Update status with file count
+                self._update_task_status(task_id, "downloading", uploaded_files=idx)
+                logger.debug(f"Downloaded {remote_file} -> {local_file} ({idx}/{total})")
         except Exception as e:
             logger.error(f"SFTP directory download failed: {e}")
             raise
@@ -242,79 +392,114 @@ class Downloader:
         state = get_state()
 
         if os.path.isdir(local_path):
-            files = []
-            for root, dirs, filenames in os.walk(local_path):
-                for fn in filenames:
-                    files.append(os.path.join(root, fn))
-
-            total_files = len(files)
-            self._update_task_status(task_id, "uploading", total_files=total_files, uploaded_files=0)
-
-            for idx, fpath in enumerate(files, 1):
-                fhash = hash_file(fpath)
-                if fhash and state.is_uploaded(fhash, dest):
-                    logger.info(f"Skipping already uploaded: {fpath}")
-                    self._update_task_status(task_id, "uploading", uploaded_files=idx)
-                    continue
+            files = list_local_files(local_path)
+        else:
+            files = [(local_path, os.path.getsize(local_path))]
 
-                self._upload_single_file(fpath, dest, chat_id, task_id)
-                if fhash:
-                    state.mark_uploaded(fhash, dest, {"name": os.path.basename(fpath)})
+        # Only the next few thumbnails are requested, so a large pack doesn't
+        # monopolise the shared thumbnail pool
+        paths = [fpath for fpath, _ in files]
+        thumbs: Dict[str, Future] = {}
+        requested = set()
 
-                # Update file progress
-                self._update_task_status(task_id, "uploading", uploaded_files=idx)
-        else:
-            # Single file
-            self._update_task_status(task_id, "uploading", total_files=1, uploaded_files=0)
-            fhash = hash_file(local_path)
-            if not fhash or not state.is_uploaded(fhash, dest):
-                self._upload_single_file(local_path, dest, chat_id, task_id)
-                if fhash:
-                    state.mark_uploaded(fhash, dest, {"name": name})
-            self._update_task_status(task_id, "uploading", uploaded_files=1)
-
-    def _upload_single_file(self, filepath, dest, chat_id, task_id):
-        """Upload a single file to the specified destination."""
-        fname = os.path.basename(filepath)
-        fsize = os.path.getsize(filepath)
+        def prefetch(start):
+            if dest == "gdrive":
+                return
+            window = [p for p in paths[start:start + THUMB_LOOKAHEAD] if p not in requested]
+            requested.update(window)
+            thumbs.update(self._prefetch_thumbnails(window))
 
+        try:
+            if os.path.isdir(local_path):
+                total_files = len(files)
+                self._update_task_status(task_id, "uploading", total_files=total_files, uploaded_files=0)
+
+                for idx, (fpath, fsize) in enumerate(files, 1):
+                    prefetch(idx - 1)
+                    thumb_fut = thumbs.pop(fpath, None)
+                    fhash = hash_file(fpath)
+                    if fhash and state.is_uploaded(fhash, dest):
+                        logger.info(f"Skipping already uploaded: {fpath}")
+                        _discard_thumb(thumb_fut)
+                        self._update_task_status(task_id, "uploading", uploaded_files=idx)
+                        continue
+
+                    self._upload_single_file(fpath, dest, chat_id, task_id, fsize, thumb_fut)
+                    if fhash:
+                        state.mark_uploaded(fhash, dest, {"name": os.path.basename(fpath)})
+
+                    # Update file progress
+                    self._update_task_status(task_id, "uploading", uploaded_files=idx)
+            else:
+                # Single file
+                self._update_task_status(task_id, "uploading", total_files=1, uploaded_files=0)
+                prefetch(0)
+                thumb_fut = thumbs.pop(local_path, None)
+                fhash = hash_file(local_path)
+                if not fhash or not state.is_uploaded(fhash, dest):
+                    self._upload_single_file(local_path, dest, chat_id, task_id, files[0][1], thumb_fut)
+                    if fhash:
+                        state.mark_uploaded(fhash, dest, {"name": name})
+                else:
+                    _discard_thumb(thumb_fut)
+                self._update_task_status(task_id, "uploading", uploaded_files=1)
+        finally:
+            for thumb_fut in thumbs.values():
+                _discard_thumb(thumb_fut)
+
+    def _prefetch_thumbnails(self, paths):
+        """Start thumbnail generation for video files; returns {path: Future}."""
+        return {
+            p: _thumb_pool.submit(generate_thumbnail, p)
+            for p in paths
+            if os.path.splitext(p)[1].lower() in THUMB_EXTS
+        }
+
+    def _upload_single_file(self, filepath, dest, chat_id, task_id, size=None, thumb_fut=None):
+        """Upload a single file to the specified destination.
+
+        `size` is the already-known file size, passed down so the upload
+        path doesn't stat the file again. `thumb_fut` is a pending
+        thumbnail from _prefetch_thumbnails (Telegram only).
+        """
         if dest == "gdrive":
-            self._upload_to_gdrive(filepath, task_id)
+            _discard_thumb(thumb_fut)
+            self._upload_to_gdrive(filepath, task_id, size)
         elif dest == "telegram":
-            self._upload_to_telegram(filepath, chat_id, task_id)
+            self._upload_to_telegram(filepath, chat_id, task_id, size, thumb_fut)
         else:
             logger.warning(f"Unknown dest '{dest}', defaulting to telegram")
-            self._upload_to_telegram(filepath, chat_id, task_id)
+            self._upload_to_telegram(filepath, chat_id, task_id, size, thumb_fut)
 
-    def _upload_to_gdrive(self, filepath, task_id):
+    def _upload_to_gdrive(self, filepath, task_id, size=None):
         """Upload file to Google Drive using rclone."""
         self._update_task_status(task_id, "uploading to gdrive")
         try:
-            import subprocess
-            cmd = ["rclone", "copy", filepath, DRIVE_DEST, "-P"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                raise RuntimeError(f"rclone failed: {result.stderr}")
+            returncode, stderr_tail = run_tail(build_rclone_cmd(filepath, size))
+            if returncode != 0:
+                raise RuntimeError(f"rclone failed: {stderr_tail}")
             logger.info(f"Uploaded to GDrive: {filepath}")
         except Exception as e:
             logger.error(f"GDrive upload failed: {e}")
             raise
 
-    def _upload_to_telegram(self, filepath, chat_id, task_id):
+    def _upload_to_telegram(self, filepath, chat_id, task_id, size=None, thumb_fut=None):
         """Upload file to Telegram with splitting if needed."""
         if not chat_id:
             logger.warning("No chat_id provided for Telegram upload")
+            _discard_thumb(thumb_fut)
             return
 
         try:
-            fsize = os.path.getsize(filepath)
+            fsize = size if size is not None else os.path.getsize(filepath)
 
             if fsize <= MAX_TG_SIZE:
                 # Direct upload (under 2GB)
                 self._update_task_status(task_id, "uploading to telegram")
-                self._upload_telegram_large(filepath, chat_id, task_id)
+                self._upload_telegram_large(filepath, chat_id, task_id, fsize, thumb_fut)
             else:
                 # Split and upload (over 2GB)
+                _discard_thumb(thumb_fut)
                 self._update_task_status(task_id, "splitting file")
                 parts = split_file(filepath)
 
@@ -341,7 +526,7 @@ class Downloader:
             logger.error(f"Telegram upload failed: {e}")
             raise
 
-    def _upload_telegram_large(self, filepath, chat_id, task_id):
+    def _upload_telegram_large(self, filepath, chat_id, task_id, size=None, thumb_fut=None):
         """Upload large file using Telethon."""
         from bot.telethon_uploader import get_telethon_uploader
         from bot.telegram_loop import get_telegram_loop
@@ -352,17 +537,22 @@ class Downloader:
 
         def progress(current, total):
             if total:
-                percent = (current / total) * 100
-                if int(percent) % 5 == 0:
-                    self._update_task_status(task_id, f"uploading ({percent:.1f}%)")
-
-        future = asyncio.run_coroutine_threadsafe(
-            uploader.upload_file(
-                filepath,
-                chat_id,
-                caption=os.path.basename(filepath),
-                progress_callback=progress
-            ),
-            loop
-        )
-        future.result()
+                self._update_task_status(task_id, "uploading to telegram", progress=(current / total) * 100)
+
+        try:
+            thumb_path = _resolve_thumb(thumb_fut)
+            future = asyncio.run_coroutine_threadsafe(
+                uploader.upload_file(
+                    filepath,
+                    chat_id,
+                    caption=os.path.basename(filepath),
+                    thumb_path=thumb_path,
+                    progress_callback=progress,
+                    file_size=size,
+                ),
+                loop
+            )
+            future.result()
+        finally:
+            # Deletes the thumbnail now, or once a late ffmpeg finishes
+            _discard_thumb(thumb_fut)
@@ -12,10 +12,11 @@ import subprocess
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any
+from typing import Dict, Any, Optional, FrozenSet
 
 from bot.state import get_state
 from bot.downloader import Downloader
+from bot.utils.subproc import run_tail
 
 logger = logging.getLogger(__name__)
 
@@ -25,10 +26,20 @@ YTDL_CMD = os.getenv("YTDL_CMD", "yt-dlp")
 _executor = ThreadPoolExecutor(max_workers=2)
 _state_manager = get_state()
 _updater = None
+_downloader: Optional[Downloader] = None
 
-def set_updater(updater):
-    global _updater
+# Jobs queued or running in this process, so /status doesn't scan job history
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+def set_updater(updater, downloader: Optional[Downloader] = None):
+    """Attach the updater and the Downloader used for uploads.
+
+    Pass the bot's shared Downloader so yt-dlp uploads show up in /status.
+    """
+    global _updater, _downloader
     _updater = updater
+    _downloader = downloader or Downloader(updater)
 
 def _run_ytdl(job_id: str, url: str, out_dir: str = None, dest: str = "telegram", chat_id: int = None):
     # Update status to running
@@ -80,40 +91,37 @@ def _run_ytdl(job_id: str, url: str, out_dir: str = None, dest: str = "telegram"
     # We default to something reasonable if not specified, but yt-dlp defaults are usually okay.
 
     try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=YTDL_MAX_RUNTIME)
-        status = 'done' if proc.returncode == 0 else 'failed'
+        returncode, stderr_tail = run_tail(cmd, timeout=YTDL_MAX_RUNTIME)
+        status = 'done' if returncode == 0 else 'failed'
         
         result_data = {
             'url': url,
             'out_dir': out_dir,
             'status': status,
-            'returncode': proc.returncode,
+            'returncode': returncode,
             'end_time': time.time()
         }
         
         # Only save stderr if failed to save space
         if status == 'failed':
-            result_data['stderr'] = proc.stderr[-1000:] # last 1000 chars
+            result_data['stderr'] = stderr_tail[-1000:] # last 1000 chars
         
         _state_manager.set_job(job_id, result_data)
         logger.info(f"Job {job_id} finished with status {status}")
 
         if status == 'done':
-            # Trigger upload
-            # Find files in job_dir
-            if _updater:
-                downloader = Downloader(_updater)
-                for f in os.listdir(job_dir):
-                    fpath = os.path.join(job_dir, f)
-                    if os.path.isfile(fpath):
-                        downloader.upload_local_file(fpath, dest=dest, chat_id=chat_id)
-            
-            # Cleanup
             try:
-                import shutil
-                shutil.rmtree(job_dir)
-            except Exception as e:
-                logger.error(f"Failed to cleanup {job_dir}: {e}")
+                # Upload everything yt-dlp wrote to job_dir in one task
+                if _downloader is None:
+                    raise RuntimeError("set_updater not called")
+                _downloader.upload_local_file(job_dir, dest=dest, chat_id=chat_id, name=f"ytdl {job_id[:8]}")
+            finally:
+                # Cleanup
+                try:
+                    import shutil
+                    shutil.rmtree(job_dir)
+                except Exception as e:
+                    logger.error(f"Failed to cleanup {job_dir}: {e}")
 
     except subprocess.TimeoutExpired as exc:
         _state_manager.set_job(job_id, {
@@ -135,13 +143,29 @@ def _run_ytdl(job_id: str, url: str, out_dir: str = None, dest: str = "telegram"
         logger.exception(f"Job {job_id} failed with exception")
 
 
+def _run_tracked(job_id: str, *args):
+    try:
+        _run_ytdl(job_id, *args)
+    finally:
+        with _active_lock:
+            _active_jobs.discard(job_id)
+
+
 def enqueue_ytdl(url: str, out_dir: str = None, dest: str = "telegram", chat_id: int = None) -> str:
     jid = str(uuid.uuid4())
     initial_state = {'url': url, 'out_dir': out_dir, 'status': 'queued', 'created_at': time.time()}
     _state_manager.set_job(jid, initial_state)
-    _executor.submit(_run_ytdl, jid, url, out_dir, dest, chat_id)
+    with _active_lock:
+        _active_jobs.add(jid)
+    _executor.submit(_run_tracked, jid, url, out_dir, dest, chat_id)
     return jid
 
 
+def active_job_ids() -> FrozenSet[str]:
+    """Snapshot of job ids that are queued or running in this process."""
+    with _active_lock:
+        return frozenset(_active_jobs)
+
+
 def job_status(job_id: str) -> Dict[str, Any]:
     return _state_manager.get_job(job_id) or {'status': 'unknown'}
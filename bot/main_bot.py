@@ -4,19 +4,24 @@ Connects to real Real-Debrid, rTorrent, and yt-dlp implementations.
 """
 
 import os
+import queue
+import re
 import time
 import logging
 import threading
-from typing import Optional, List, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, List, Dict, Any
 from telegram import Update
-from telegram.ext import Updater, CommandHandler, CallbackContext
+from telegram.error import RetryAfter
+from telegram.ext import Updater, MessageHandler, Filters, CallbackContext, Defaults
 
-from bot.config import BOT_TOKEN
+from bot.config import BOT_TOKEN, WEBHOOK_URL, PORT, ALLOWED_USER_IDS, RSS_NOTIFY_CHAT
 from bot.clients.realdebrid import RDClient, RealDebridNotConfigured, RDAPIError
 from bot.clients.seedbox import SeedboxClient, SeedboxNotConfigured, SeedboxCommunicationError
-from bot.jobs import enqueue_ytdl, job_status, set_updater as jobs_set_updater
-from bot.rss import FeedManager, Router
-from bot.monitor import Monitor
+from bot.jobs import enqueue_ytdl, job_status, active_job_ids, set_updater as jobs_set_updater
+from bot.rss import FeedManager, Router, SCHEDULER_TICK
+from bot.monitor import Monitor, POLL_INTERVAL as MONITOR_INTERVAL
 from bot.downloader import Downloader
 from bot.state import get_state
 from bot.utils.system_info import format_system_metrics
@@ -25,134 +30,309 @@ from bot.status_manager import get_status_manager
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# --- Clients ---
-try:
-    rd_client = RDClient()
-except RealDebridNotConfigured:
-    rd_client = None
-
-try:
-    sb_client = SeedboxClient()
-except SeedboxNotConfigured:
-    sb_client = None
-
-# --- RSS Manager ---
-feed_manager = None
-if rd_client or sb_client:
-    router = Router(rd_client=rd_client, sb_client=sb_client)
-    feed_manager = FeedManager(router)
-
-# --- Monitor ---
-monitor = None
-if rd_client or sb_client:
-    # Downloader needs updater, but we don't have it yet.
-    # We will attach it inside create_app or run.
+# --- Services ---
+# Built by _init_services() from run(), so importing this module (tests,
+# scripts) doesn't read credentials or log missing-config errors.
+rd_client: Optional[RDClient] = None
+sb_client: Optional[SeedboxClient] = None
+feed_manager: Optional[FeedManager] = None
+downloader: Optional[Downloader] = None
+monitor: Optional[Monitor] = None
+
+def _init_services():
+    global rd_client, sb_client, feed_manager, downloader, monitor
+    try:
+        rd_client = RDClient()
+    except RealDebridNotConfigured:
+        rd_client = None
+
+    try:
+        sb_client = SeedboxClient()
+    except SeedboxNotConfigured:
+        sb_client = None
+
+    # Shared by the monitor, download commands and yt-dlp jobs so every
+    # transfer shows up in /status; the updater is attached in run()
     downloader = Downloader(telegram_updater=None)
-    monitor = Monitor(downloader, rd_client=rd_client, sb_client=sb_client)
+    if rd_client or sb_client:
+        feed_manager = FeedManager(Router(rd_client=rd_client, sb_client=sb_client))
+        monitor = Monitor(downloader, rd_client=rd_client, sb_client=sb_client)
+
+# --- Display tables ---
+_RD_ICON = {
+    "downloaded": "✅",
+    "downloading": "⬇️",
+    "waiting_files_selection": "⏳",
+    "magnet_conversion": "🧲",
+    "error": "❌",
+}
+_RD_LABEL = {k: k.replace('_', ' ').title() for k in (*_RD_ICON, "queued", "dead", "uploading", "compressing", "virus", "magnet_error")}
 
 # --- Utils ---
+def check_auth(user_id: int) -> bool:
+    """True if `user_id` may use the bot (ALLOWED_USER_IDS unset = open)."""
+    return not ALLOWED_USER_IDS or user_id in ALLOWED_USER_IDS
+
+_BTIH_RE = re.compile(r'xt=urn:btih:([a-zA-Z0-9]+)')
+
+# Characters that need escaping in Markdown v1: _ * [ `
+_MD_ESCAPE = str.maketrans({c: f"\\{c}" for c in "_*[`"})
+
 def escape_markdown(text: str) -> str:
     """Escape special characters for Telegram Markdown v1."""
-    # Characters that need escaping in Markdown: _ * [ `
-    # However, since we use backticks for the table part, we mostly care about name
-    chars = ['_', '*', '[', '`']
-    for c in chars:
-        text = text.replace(c, f"\\{c}")
-    return text
+    return text.translate(_MD_ESCAPE)
+
+_BYTE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+def fmt_bytes(b) -> str:
+    """Format a byte count with a 1024-based unit, e.g. 1536 -> '2KB'."""
+    b = int(b or 0)
+    idx = min(len(_BYTE_UNITS) - 1, max(0, (b.bit_length() - 1) // 10))
+    return f"{b / (1 << (idx * 10)):.0f}{_BYTE_UNITS[idx]}"
+
+TG_MESSAGE_LIMIT = 4000  # Telegram caps messages at 4096 chars
+
+def _chunk(text: str, limit: int = TG_MESSAGE_LIMIT):
+    """Yield pieces of `text` no longer than `limit`, split on line boundaries."""
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        yield text[:cut]
+        text = text[cut + 1:] if text[cut] == "\n" else text[cut:]
+    if text:
+        yield text
+
+SEND_RETRIES = 3
+
+def _reply_chunked(update: Update, text: str, **kwargs):
+    """Reply with `text`, split over as many messages as needed (in order)."""
+    _send_chunked(update.message.reply_text, text, **kwargs)
+
+def _send_chunked(send, text: str, **kwargs):
+    """Send `text` in order via `send(part, **kwargs)`, one call per chunk.
+
+    Bulk sends can trip Telegram's flood control; on RetryAfter the chunk
+    is resent after the requested delay instead of dropping the rest.
+    """
+    for part in _chunk(text):
+        for attempt in range(SEND_RETRIES):
+            try:
+                send(part, **kwargs)
+                break
+            except RetryAfter as e:
+                if attempt == SEND_RETRIES - 1:
+                    raise
+                logger.warning("Rate-limited by Telegram, retrying in %ss", e.retry_after)
+                time.sleep(e.retry_after)
+
+# --- Short-lived caches ---
+def _cached_build(cache: Dict[str, Any], lock: threading.Lock, ttl: float, build: Callable[[], Any]) -> Any:
+    """Return cache["value"] if younger than `ttl`, else rebuild it once.
+
+    The lock only guards the cache dict, never the build itself: concurrent
+    callers wait on the one in-flight build instead of queueing behind the
+    lock. A build that raises is passed to every waiter and not cached.
+    """
+    with lock:
+        if cache["value"] is not None and time.monotonic() - cache["t"] < ttl:
+            return cache["value"]
+        fut = cache["inflight"]
+        owner = fut is None
+        if owner:
+            fut = cache["inflight"] = Future()
+    if not owner:
+        return fut.result()
+    try:
+        value = build()
+    except Exception as e:
+        with lock:
+            if cache["inflight"] is fut:
+                cache["inflight"] = None
+        fut.set_exception(e)
+        raise
+    with lock:
+        # Skip storing if the cache was invalidated while we were building
+        if cache["inflight"] is fut:
+            cache["inflight"] = None
+            cache["value"] = value
+            cache["t"] = time.monotonic()
+    fut.set_result(value)
+    return value
+
+# --- Seedbox listing cache ---
+SB_LIST_TTL = 2.0  # seconds; collapses rapid repeat /sb_* commands into one RPC
+_sb_list_cache = {"t": 0.0, "value": None, "inflight": None}
+_sb_list_lock = threading.Lock()
+
+def _fetch_sb_list():
+    items = sb_client.list_torrents()
+    return items, {t['hash']: t for t in items}
+
+def _sb_list_cached():
+    """Return (torrents, {hash: torrent}) from a short-lived cache of sb_client.list_torrents().
+
+    The RPC runs outside _sb_list_lock, so a hung seedbox only blocks the
+    handlers waiting on that one listing.
+    """
+    return _cached_build(_sb_list_cache, _sb_list_lock, SB_LIST_TTL, _fetch_sb_list)
+
+def _invalidate_sb_list():
+    """Drop the cached listing after a command changes seedbox state."""
+    with _sb_list_lock:
+        _sb_list_cache["value"] = None
+        # A listing already in flight may predate the change; don't store it
+        _sb_list_cache["inflight"] = None
+
+# --- Listing rows ---
+_RD_HEADER = f"`{'Status':<12} | {'Progress':<8} | Filename`\n`{'-'*12}-|-{'-'*8}-|{'-'*20}`"
+_DL_HEADER = f"`{'Date':<12} | {'Size':<8} | Filename`\n`{'-'*12}-|-{'-'*8}-|{'-'*20}`"
+# SeedboxClient only reports these states; pre-pad the column once
+_SB_STATE_CELL = {s: f"{s.title():<10}" for s in ("seeding", "downloading", "paused", "unknown")}
+_SB_HEADER = f"`{'State':<10} | {'Progress':<6} | Name`\n`{'-'*10}-|-{'-'*6}-|{'-'*20}`"
+
+def _render_rd_row(i: Dict[str, Any]) -> str:
+    status = i.get('status', 'unknown')
+    filename = i.get('filename', 'N/A')
+    # Truncate filename if too long
+    if len(filename) > 35:
+        filename = filename[:33] + ".."
+    label = _RD_LABEL.get(status) or status.replace('_', ' ').title()
+    display_status = f"{_RD_ICON.get(status, '❓')} {label}"
+    return f"`{display_status:<12} | {i.get('progress', 0):>6}% |` {filename}\n└ ID: `{i.get('id', 'N/A')}`"
+
+def _render_dl_row(i: Dict[str, Any]) -> str:
+    generated = i.get('generated', 'N/A')[:10] # Just date part
+    filename = i.get('filename', 'N/A')
+    # Truncate and escape filename
+    if len(filename) > 30:
+        filename = filename[:28] + ".."
+    filename = escape_markdown(filename)
+    return f"`{generated:<12} | {fmt_bytes(i.get('filesize', 0)):<8} |` {filename}\n└ ID: `{i.get('id', 'N/A')}`"
+
+def _render_sb_row(i: Dict[str, Any]) -> str:
+    name = i.get('name', 'N/A')
+    # Truncate and escape name
+    if len(name) > 30:
+        name = name[:28] + ".."
+    name = escape_markdown(name)
+    state = i.get('state', 'unknown')
+    state_cell = _SB_STATE_CELL.get(state) or f"{state.title():<10}"
+    return f"`{state_cell} | {i.get('progress', 0.0):>5.1f}% |` {name}\n└ Hash: `{i.get('hash', 'N/A')}`"
 
 # --- Status Generation (Extracted for reuse) ---
+STATUS_CACHE_TTL = 2.0  # seconds; absorbs /status bursts and concurrent live updates
+_status_cache = {"t": 0.0, "value": None, "inflight": None}
+_status_lock = threading.Lock()
+STATUS_FETCH_TIMEOUT = 10  # seconds to wait on each backend listing
+_status_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="status")
+
 def _generate_status_text() -> str:
-    """Generate status text for display and live updates."""
+    """Generate status text for display and live updates (cached briefly)."""
     try:
-        lines = ["📡 *System Status*"]
-
-        # 1. Downloader (Active Transfers) - ENHANCED with file counts
-        active = downloader.get_active_tasks()
-        if active:
-            lines.append("\n⬇️ *Active Transfers:*")
-            for tid, t in active.items():
-                name = escape_markdown(t['name'])
-                if len(name) > 25:
-                    name = name[:23] + ".."
-                start_ago = int(time.time() - t['start_time'])
-
-                # Build status string with progress and file count
-                status_str = t['status'].title()
-
-                # Add progress percentage if available
-                if t.get('progress_percent', 0) > 0:
-                    status_str = f"{status_str} ({t['progress_percent']:.1f}%)"
-
-                # Add file count if available
-                if t.get('total_files', 0) > 0:
-                    status_str += f" | {t['uploaded_files']}/{t['total_files']} files"
-
-                lines.append(f"• `{name}`\n  └ {status_str} | {start_ago}s ago")
+        return _cached_build(_status_cache, _status_lock, STATUS_CACHE_TTL, _build_status_text)
+    except Exception as e:
+        logger.error("Error generating status: %s", e)
+        return f"Error getting status: {e}"
 
-        # 2. Seedbox (rtorrent)
-        if sb_client:
-            try:
-                sbt = sb_client.list_torrents()
-                active_sb = [t for t in sbt if t.get('state') in ['downloading', 'hashing']]
-                if active_sb:
-                    lines.append("\n📦 *Seedbox:*")
-                    for t in active_sb:
-                        name = escape_markdown(t['name'])
-                        if len(name) > 25:
-                            name = name[:23] + ".."
-                        lines.append(f"• `{name}`\n  └ {t['state'].title()} | {t['progress']:.1f}%")
-            except Exception as e:
-                logger.error(f"Error getting seedbox status: {e}")
-
-        # 3. Real-Debrid
-        if rd_client:
-            try:
-                rdt = rd_client.list_torrents()
-                active_rd = [t for t in rdt if t['status'] not in ['downloaded', 'dead']]
-                if active_rd:
-                    lines.append("\n☁️ *Real-Debrid:*")
-                    for t in active_rd:
-                        name = escape_markdown(t['filename'])
-                        if len(name) > 25:
-                            name = name[:23] + ".."
-                        lines.append(f"• `{name}`\n  └ {t['status'].replace('_', ' ').title()} | {t['progress']}%")
-            except Exception as e:
-                logger.error(f"Error getting RD status: {e}")
-
-        # 4. yt-dlp Queue
+def _short_name(raw: str) -> str:
+    name = escape_markdown(raw)
+    return name if len(name) <= 25 else name[:23] + ".."
+
+def _fmt_transfer(t: Dict[str, Any], now: float) -> str:
+    """One downloader task as a status entry: state, progress and file count."""
+    status_str = t['status'].title()
+    progress = t.get('progress_percent', 0)
+    if progress > 0:
+        status_str = f"{status_str} ({progress:.1f}%)"
+    total_files = t.get('total_files', 0)
+    if total_files > 0:
+        status_str += f" | {t['uploaded_files']}/{total_files} files"
+    return f"• `{_short_name(t['name'])}`\n  └ {status_str} | {int(now - t['start_time'])}s ago"
+
+def _build_status_text() -> str:
+    """Assemble the status text from downloader, seedbox, RD and jobs."""
+    # Fetch both backends concurrently; each result is awaited in its own section
+    sb_fut = _status_pool.submit(sb_client.list_torrents) if sb_client else None
+    rd_fut = _status_pool.submit(rd_client.list_torrents, active_only=True, limit=50) if rd_client else None
+
+    lines = ["📡 *System Status*"]
+
+    # 1. Downloader (Active Transfers) - ENHANCED with file counts
+    active = downloader.get_active_tasks() if downloader else {}
+    if active:
+        lines.append("\n⬇️ *Active Transfers:*")
+        now = time.time()
+        lines.extend(_fmt_transfer(t, now) for t in active.values())
+
+    # 2. Seedbox (rtorrent)
+    if sb_fut:
         try:
-            state = get_state()
-            all_jobs = state.list_jobs()
-            active_jobs = {jid: jinfo for jid, jinfo in all_jobs.items() if jinfo['status'] in ['queued', 'processing', 'running']}
-            if active_jobs:
-                lines.append("\n🎬 *yt-dlp Jobs:*")
-                for jid, jinfo in active_jobs.items():
-                    lines.append(f"• `{jid[:8]}...`\n  └ {jinfo['status'].title()} | {jinfo.get('dest', 'telegram').upper()}")
+            sbt = sb_fut.result(timeout=STATUS_FETCH_TIMEOUT)
+            active_sb = [t for t in sbt if t.get('state') in ['downloading', 'hashing']]
+            if active_sb:
+                lines.append("\n📦 *Seedbox:*")
+                lines.extend(
+                    f"• `{_short_name(t['name'])}`\n  └ {t['state'].title()} | {t['progress']:.1f}%"
+                    for t in active_sb
+                )
         except Exception as e:
-            logger.error(f"Error getting job status: {e}")
+            logger.error("Error getting seedbox status: %s", e)
 
-        if len(lines) == 1:
-            lines.append("\n✅ Everything is idle.")
-
-        # 5. System Metrics
+    # 3. Real-Debrid
+    if rd_fut:
         try:
-            lines.append("\n" + format_system_metrics())
+            active_rd = rd_fut.result(timeout=STATUS_FETCH_TIMEOUT)
+            if active_rd:
+                lines.append("\n☁️ *Real-Debrid:*")
+                lines.extend(
+                    f"• `{_short_name(t['filename'])}`\n  └ "
+                    f"{_RD_LABEL.get(t['status']) or t['status'].replace('_', ' ').title()} | {t['progress']}%"
+                    for t in active_rd
+                )
         except Exception as e:
-            logger.error(f"Error formatting system metrics: {e}")
+            logger.error("Error getting RD status: %s", e)
+
+    # 4. yt-dlp Queue
+    try:
+        # Only look up this process's in-flight jobs, not the whole job history
+        active_jobs = {}
+        for jid in active_job_ids():
+            jinfo = job_status(jid)
+            if jinfo['status'] in ('queued', 'processing', 'running'):
+                active_jobs[jid] = jinfo
+        if active_jobs:
+            lines.append("\n🎬 *yt-dlp Jobs:*")
+            for jid, jinfo in active_jobs.items():
+                lines.append(f"• `{jid[:8]}...`\n  └ {jinfo['status'].title()} | {jinfo.get('dest', 'telegram').upper()}")
+    except Exception as e:
+        logger.error("Error getting job status: %s", e)
 
-        return "\n".join(lines)
+    if len(lines) == 1:
+        lines.append("\n✅ Everything is idle.")
 
+    # 5. System Metrics
+    try:
+        lines.append("\n" + format_system_metrics())
     except Exception as e:
-        logger.error(f"Error generating status: {e}")
-        return f"Error getting status: {e}"
+        logger.error("Error formatting system metrics: %s", e)
+
+    return "\n".join(lines)
 
 # --- Handlers ---
+_START_TEXT: Optional[str] = None
+
 def start(update: Update, context: CallbackContext):
-    msg = "WZML-X v1 (Production)\n\n"
-    msg += f"Real-Debrid: {'✅' if rd_client else '❌'}\n"
-    msg += f"Seedbox: {'✅' if sb_client else '❌'}\n"
-    msg += f"RSS Manager: {'✅' if feed_manager else '❌'}"
-    update.message.reply_text(msg)
+    # Client availability is fixed once the bot is running; build the text once
+    global _START_TEXT
+    if _START_TEXT is None:
+        _START_TEXT = (
+            "WZML-X v1 (Production)\n\n"
+            f"Real-Debrid: {'✅' if rd_client else '❌'}\n"
+            f"Seedbox: {'✅' if sb_client else '❌'}\n"
+            f"RSS Manager: {'✅' if feed_manager else '❌'}"
+        )
+    update.message.reply_text(_START_TEXT)
 
 # Real-Debrid Commands
 def rd_torrent(update: Update, context: CallbackContext):
@@ -161,6 +341,9 @@ def rd_torrent(update: Update, context: CallbackContext):
     magnet = context.args[0]
     try:
         res = rd_client.add_magnet(magnet)
+        if res.get('id'):
+            # Remember who asked so the monitor can upload the result here
+            get_state().set_intent(f"rd_{res['id']}", "telegram", chat_id=update.effective_chat.id)
         update.message.reply_text(f"Added to RD: {res.get('id', 'unknown')}")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
@@ -172,37 +355,8 @@ def rd_torrents(update: Update, context: CallbackContext):
         items = rd_client.list_torrents(limit=20)
         if not items:
             return update.message.reply_text("No active RD torrents")
-        lines = []
-        lines.append(f"`{'Status':<12} | {'Progress':<8} | Filename`")
-        lines.append(f"`{'-'*12}-|-{'-'*8}-|{'-'*20}`")
-        for i in items:
-            status = i.get('status', 'unknown')
-            progress = i.get('progress', 0)
-            filename = i.get('filename', 'N/A')
-            # Truncate filename if too long
-            if len(filename) > 35:
-                filename = filename[:33] + ".."
-            # Status icons
-            icon = "❓"
-            if status == "downloaded":
-                icon = "✅"
-            elif status == "downloading":
-                icon = "⬇️"
-            elif status == "waiting_files_selection":
-                icon = "⏳"
-            elif status == "magnet_conversion":
-                icon = "🧲"
-            elif status == "error":
-                icon = "❌"
-            # Format status for display
-            display_status = f"{icon} {status.replace('_', ' ').title()}"
-            tid = i.get('id', 'N/A')
-            line = f"`{display_status:<12} | {progress:>6}% |` {filename}\n└ ID: `{tid}`"
-            lines.append(line)
-        text = "\n".join(lines)
-        if len(text) > 4000:
-            text = text[:4000] + "\n...truncated..."
-        update.message.reply_text(text, parse_mode="Markdown")
+        text = _RD_HEADER + "\n" + "\n".join(_render_rd_row(i) for i in items)
+        _reply_chunked(update, text, parse_mode="Markdown")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
 
@@ -222,30 +376,8 @@ def rd_downloads(update: Update, context: CallbackContext):
         items = rd_client.get_downloads(limit=15)
         if not items:
             return update.message.reply_text("No downloads history")
-        lines = []
-        lines.append(f"`{'Date':<12} | {'Size':<8} | Filename`")
-        lines.append(f"`{'-'*12}-|-{'-'*8}-|{'-'*20}`")
-        for i in items:
-            generated = i.get('generated', 'N/A')[:10] # Just date part
-            filename = i.get('filename', 'N/A')
-            filesize = i.get('filesize', 0)
-            # Format bytes
-            def fmt_bytes(b):
-                for unit in ['B', 'KB', 'MB', 'GB']:
-                    if b < 1024.0: return f"{b:.0f}{unit}"
-                    b /= 1024.0
-                return f"{b:.0f}TB"
-            # Truncate and escape filename
-            if len(filename) > 30:
-                filename = filename[:28] + ".."
-            filename = escape_markdown(filename)
-            tid = i.get('id', 'N/A')
-            line = f"`{generated:<12} | {fmt_bytes(filesize):<8} |` {filename}\n└ ID: `{tid}`"
-            lines.append(line)
-        text = "\n".join(lines)
-        if len(text) > 4000:
-            text = text[:4000] + "\n...truncated..."
-        update.message.reply_text(text, parse_mode="Markdown")
+        text = _DL_HEADER + "\n" + "\n".join(_render_dl_row(i) for i in items)
+        _reply_chunked(update, text, parse_mode="Markdown")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
 
@@ -263,40 +395,28 @@ def rd_unrestrict(update: Update, context: CallbackContext):
 def sb_torrent(update: Update, context: CallbackContext):
     if not sb_client: return update.message.reply_text("Seedbox not configured")
     if not context.args: return update.message.reply_text("Usage: /sb_torrent <magnet>")
+    match = _BTIH_RE.search(context.args[0])
+    intent_id = f"sb_{match.group(1).upper()}" if match else None
+    if intent_id:
+        get_state().set_intent(intent_id, "telegram", chat_id=update.effective_chat.id)
     try:
         sb_client.add_torrent(context.args[0])
+        _invalidate_sb_list()
         update.message.reply_text("Added torrent to Seedbox.")
     except Exception as e:
+        # Nothing was added; don't leave the intent for a later add to inherit
+        if intent_id:
+            get_state().clear_intent(intent_id)
         update.message.reply_text(f"Error: {e}")
 
 def sb_torrents(update: Update, context: CallbackContext):
     if not sb_client: return update.message.reply_text("Seedbox not configured")
     try:
-        items = sb_client.list_torrents()
+        items, _ = _sb_list_cached()
         if not items:
             return update.message.reply_text("No torrents in Seedbox")
-        lines = []
-        lines.append(f"`{'State':<10} | {'Progress':<6} | Name`")
-        lines.append(f"`{'-'*10}-|-{'-'*6}-|{'-'*20}`")
-        for i in items:
-            name = i.get('name', 'N/A')
-            # Truncate and escape name
-            if len(name) > 30:
-                name = name[:28] + ".."
-            name = escape_markdown(name)
-            state = i.get('state', 'unknown').title()
-            progress = i.get('progress', 0.0)
-            icon = "❓"
-            if state == "Seeding": icon = "🟢"
-            elif state == "Downloading": icon = "⬇️"
-            elif state == "Paused": icon = "⏸️"
-            shash = i.get('hash', 'N/A')
-            line = f"`{state:<10} | {progress:>5.1f}% |` {name}\n└ Hash: `{shash}`"
-            lines.append(line)
-        text = "\n".join(lines)
-        if len(text) > 4000:
-            text = text[:4000] + "\n...truncated..."
-        update.message.reply_text(text, parse_mode="Markdown")
+        text = _SB_HEADER + "\n" + "\n".join(_render_sb_row(i) for i in items)
+        _reply_chunked(update, text, parse_mode="Markdown")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
 
@@ -305,6 +425,7 @@ def sb_stop(update: Update, context: CallbackContext):
     if not context.args: return update.message.reply_text("Usage: /sb_stop <hash>")
     try:
         sb_client.stop_torrent(context.args[0])
+        _invalidate_sb_list()
         update.message.reply_text("Stopped.")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
@@ -314,6 +435,7 @@ def sb_start(update: Update, context: CallbackContext):
     if not context.args: return update.message.reply_text("Usage: /sb_start <hash>")
     try:
         sb_client.start_torrent(context.args[0])
+        _invalidate_sb_list()
         update.message.reply_text("Started.")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
@@ -323,6 +445,7 @@ def sb_delete(update: Update, context: CallbackContext):
     if not context.args: return update.message.reply_text("Usage: /sb_delete <hash>")
     try:
         sb_client.delete_torrent(context.args[0])
+        _invalidate_sb_list()
         update.message.reply_text("Deleted.")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
@@ -359,6 +482,8 @@ def rd_download(update: Update, context: CallbackContext):
         chat_id = update.effective_chat.id
         downloader.process_item(dl_url, filename, dest=dest, chat_id=chat_id)
         update.message.reply_text(f"Downloading {filename} to {dest}")
+    except queue.Full:
+        update.message.reply_text("Download queue is full, try again later")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
 
@@ -371,8 +496,8 @@ def sb_download(update: Update, context: CallbackContext):
         return
     dest = context.args[1] if len(context.args) > 1 else "telegram"
     try:
-        torrents = sb_client.list_torrents()
-        torrent = next((t for t in torrents if t['hash'] == thash), None)
+        _, by_hash = _sb_list_cached()
+        torrent = by_hash.get(thash)
         if not torrent:
             update.message.reply_text("Torrent not found")
             return
@@ -384,6 +509,8 @@ def sb_download(update: Update, context: CallbackContext):
         chat_id = update.effective_chat.id
         downloader.process_item(dl_url, torrent['name'], dest=dest, chat_id=chat_id, size=torrent.get('size', 0))
         update.message.reply_text(f"Downloading {torrent['name']} to {dest}")
+    except queue.Full:
+        update.message.reply_text("Download queue is full, try again later")
     except Exception as e:
         update.message.reply_text(f"Error: {e}")
 
@@ -405,10 +532,10 @@ def status(update: Update, context: CallbackContext):
         message = update.message.reply_text(status_text, parse_mode="Markdown")
 
         # Start live updates
-        sm.start_live_status(user_id, chat_id, message.message_id)
+        sm.start_live_status(user_id, chat_id, message.message_id, status_text)
 
     except Exception as e:
-        logger.error(f"Error in status command: {e}")
+        logger.error("Error in status command: %s", e)
         update.message.reply_text(f"Error getting status: {e}")
 
 # yt-dlp Commands
@@ -445,7 +572,7 @@ def rd_torrent_gdrive(update: Update, context: CallbackContext):
         resp = rd_client.add_magnet(magnet)
         tid = resp.get('id')
         if tid:
-            get_state().set_intent(f"rd_{tid}", "gdrive")
+            get_state().set_intent(f"rd_{tid}", "gdrive", chat_id=update.effective_chat.id)
             update.message.reply_text(f"Added to RD (Dest: GDrive). ID: {tid}")
         else:
             update.message.reply_text(f"Added to RD but no ID returned: {resp}")
@@ -454,7 +581,6 @@ def rd_torrent_gdrive(update: Update, context: CallbackContext):
 
 def sb_torrent_gdrive(update: Update, context: CallbackContext):
     """Add magnet to Seedbox and upload to GDrive."""
-    import re
     if not _check_sb(update): return
     magnet = _get_arg(context)
     if not magnet:
@@ -462,16 +588,19 @@ def sb_torrent_gdrive(update: Update, context: CallbackContext):
         return
     # Extract hash from magnet for intent
     # magnet:?xt=urn:btih:HASH&...
-    match = re.search(r'xt=urn:btih:([a-zA-Z0-9]+)', magnet)
-    if match:
-        thash = match.group(1).upper()
-        get_state().set_intent(f"sb_{thash}", "gdrive")
+    match = _BTIH_RE.search(magnet)
+    intent_id = f"sb_{match.group(1).upper()}" if match else None
+    if intent_id:
+        get_state().set_intent(intent_id, "gdrive", chat_id=update.effective_chat.id)
     else:
         update.message.reply_text("Warning: Could not extract hash from magnet. Intent might fail.")
     try:
         sb_client.add_torrent(magnet)
+        _invalidate_sb_list()
         update.message.reply_text(f"Added to Seedbox (Dest: GDrive).")
     except Exception as e:
+        if intent_id:
+            get_state().clear_intent(intent_id)
         update.message.reply_text(f"Error: {e}")
 
 def check_job(update: Update, context: CallbackContext):
@@ -496,31 +625,103 @@ def list_feeds(update: Update, context: CallbackContext):
     lines = [f"• {f.url} (force={f.forced_backend}, priv={f.private_torrents})" for f in feeds]
     update.message.reply_text("\n".join(lines))
 
+_feed_add_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="feed-add")
+
+def _add_feed_entry(backend: str, entry: Dict) -> List[str]:
+    """Hand one routed feed entry to its backend; returns report lines."""
+    title = entry.get('title', 'Unknown')
+    link = entry.get('link') or entry.get('guid')
+    lines = [f"Route {title} -> {backend}"]
+    try:
+        if backend == 'rd' and rd_client:
+            rd_client.add_magnet(link)
+        elif backend == 'sb' and sb_client:
+            sb_client.add_torrent(link)
+            _invalidate_sb_list()
+    except Exception as e:
+        lines.append(f"Error adding {title}: {e}")
+    return lines
+
+def _poll_and_add(poll: Callable) -> List[str]:
+    """Run `poll(on_decision)` and hand every routed entry to its backend.
+
+    All entries from one poll are added concurrently and reported together,
+    so a batch produces one summary instead of a message per item.
+    """
+    futures = []
+    def on_decide(backend, entry):
+        # Adds run concurrently; RD calls still pass through the client's rate limiter
+        futures.append(_feed_add_pool.submit(_add_feed_entry, backend, entry))
+    poll(on_decide)
+    return [line for f in futures for line in f.result()]
+
 def poll_feeds(update: Update, context: CallbackContext):
     if not feed_manager: return update.message.reply_text("RSS Manager disabled")
-    results = []
-    def on_decide(backend, entry):
-        title = entry.get('title', 'Unknown')
-        link = entry.get('link') or entry.get('guid')
-        results.append(f"Route {title} -> {backend}")
-        # Action!
-        try:
-            if backend == 'rd' and rd_client:
-                rd_client.add_magnet(link)
-            elif backend == 'sb' and sb_client:
-                sb_client.add_torrent(link)
-        except Exception as e:
-            results.append(f"Error adding {title}: {e}")
     update.message.reply_text("Polling...")
-    feed_manager.poll_once(on_decision=on_decide)
-    if results:
-        update.message.reply_text("\n".join(results))
+    lines = _poll_and_add(lambda cb: feed_manager.poll_once(on_decision=cb))
+    if lines:
+        _reply_chunked(update, "\n".join(lines))
     else:
         update.message.reply_text("No new items routed.")
 
 # --- App ---
+HANDLER_WORKERS = int(os.getenv("HANDLER_WORKERS", "16"))
+
+CMD_TABLE = {
+    "start": start,
+    # RD
+    "rd_torrent": rd_torrent,
+    "rd_torrents": rd_torrents,
+    "rd_delete": rd_delete,
+    "rd_downloads": rd_downloads,
+    "rd_unrestrict": rd_unrestrict,
+    "rd_download": rd_download,
+    # Seedbox
+    "sb_torrent": sb_torrent,
+    "sb_torrents": sb_torrents,
+    "sb_stop": sb_stop,
+    "sb_start": sb_start,
+    "sb_delete": sb_delete,
+    "sb_download": sb_download,
+    # yt-dlp
+    "rd_torrent_gdrive": rd_torrent_gdrive,
+    "sb_torrent_gdrive": sb_torrent_gdrive,
+    "ytdl": ytdl,
+    "ytdl_gdrive": ytdl_gdrive,
+    "job": check_job,
+    "status": status,
+    # RSS
+    "add_feed": add_feed,
+    "list_feeds": list_feeds,
+    "poll_feeds": poll_feeds,
+}
+
+# /command[@botname] [args...] -- anything else is rejected before lookup
+_CMD_RE = re.compile(r'^/(?P<cmd>\w+)(?:@(?P<target>\w+))?(?:\s+(?P<args>.*))?$', re.DOTALL)
+
+def _dispatch(update: Update, context: CallbackContext):
+    """Route a /command message to its handler via CMD_TABLE."""
+    m = _CMD_RE.match(update.message.text or "")
+    if not m:
+        return
+    cmd, target = m.group('cmd'), m.group('target')
+    # In groups, ignore commands addressed to another bot
+    if target and target.lower() != context.bot.username.lower():
+        return
+    fn = CMD_TABLE.get(cmd.lower())
+    if fn is None:
+        return
+    user = update.effective_user
+    if not check_auth(user.id if user else None):
+        logger.warning("Ignoring /%s from unauthorized user %s", cmd, user.id if user else None)
+        return
+    context.args = (m.group('args') or "").split()
+    fn(update, context)
+
 def create_app(token: str) -> Updater:
-    updater = Updater(token)
+    # Handlers block on RD/seedbox HTTP calls; run them on the worker pool so
+    # one slow command doesn't stall the dispatcher for everyone else.
+    updater = Updater(token, workers=HANDLER_WORKERS, defaults=Defaults(run_async=True))
     dp = updater.dispatcher
 
     # Initialize status manager
@@ -528,35 +729,26 @@ def create_app(token: str) -> Updater:
     sm.set_bot(updater.bot)
     sm.set_status_generator(_generate_status_text)
 
-    dp.add_handler(CommandHandler("start", start))
-    # RD
-    dp.add_handler(CommandHandler("rd_torrent", rd_torrent))
-    dp.add_handler(CommandHandler("rd_torrents", rd_torrents))
-    dp.add_handler(CommandHandler("rd_delete", rd_delete))
-    dp.add_handler(CommandHandler("rd_downloads", rd_downloads))
-    dp.add_handler(CommandHandler("rd_unrestrict", rd_unrestrict))
-    dp.add_handler(CommandHandler("rd_download", rd_download))
-    # Seedbox
-    dp.add_handler(CommandHandler("sb_torrent", sb_torrent))
-    dp.add_handler(CommandHandler("sb_torrents", sb_torrents))
-    dp.add_handler(CommandHandler("sb_stop", sb_stop))
-    dp.add_handler(CommandHandler("sb_start", sb_start))
-    dp.add_handler(CommandHandler("sb_delete", sb_delete))
-    dp.add_handler(CommandHandler("sb_download", sb_download))
-    # yt-dlp
-    dp.add_handler(CommandHandler("rd_torrent_gdrive", rd_torrent_gdrive))
-    dp.add_handler(CommandHandler("sb_torrent_gdrive", sb_torrent_gdrive))
-    dp.add_handler(CommandHandler("ytdl", ytdl))
-    dp.add_handler(CommandHandler("ytdl_gdrive", ytdl_gdrive))
-    dp.add_handler(CommandHandler("job", check_job))
-    dp.add_handler(CommandHandler("status", status))
-    # RSS
-    dp.add_handler(CommandHandler("add_feed", add_feed))
-    dp.add_handler(CommandHandler("list_feeds", list_feeds))
-    dp.add_handler(CommandHandler("poll_feeds", poll_feeds))
+    # One handler + dict lookup instead of a CommandHandler per command
+    dp.add_handler(MessageHandler(Filters.command & Filters.update.message, _dispatch))
 
     return updater
 
+def _rss_job(context: CallbackContext):
+    try:
+        lines = _poll_and_add(lambda cb: feed_manager.run_due(on_decision=cb))
+    except Exception as e:
+        logger.exception("Uncaught error during RSS polling: %s", e)
+        return
+    if not lines:
+        return
+    logger.info("RSS: %s", "; ".join(lines))
+    if RSS_NOTIFY_CHAT:
+        try:
+            _send_chunked(partial(context.bot.send_message, RSS_NOTIFY_CHAT), "📰 RSS\n" + "\n".join(lines))
+        except Exception as e:
+            logger.error("Failed to send RSS summary: %s", e)
+
 def run():
     token = (BOT_TOKEN or os.getenv("BOT_TOKEN", "")).strip()
     if not token:
@@ -565,23 +757,38 @@ def run():
     # Debug info (safe part only)
     logger.info(f"DEBUG: Token loaded. Length: {len(token)} | Starts with: {token[:4]}... | Ends with: ...{token[-4:]} | Hidden chars check: {repr(token) == repr(token.strip())}")
 
+    # Heroku names the dyno after its Procfile process (e.g. "web.1"); only a
+    # web dyno receives HTTP, so each process type must match the update mode
+    dyno = os.getenv("DYNO", "")
+    if dyno.startswith("web.") and not WEBHOOK_URL:
+        logger.error("Running as a web dyno without WEBHOOK_URL; use the worker process for long polling")
+        return
+    if dyno.startswith("worker.") and WEBHOOK_URL:
+        logger.error("WEBHOOK_URL is set but running as a worker dyno; switch the Procfile entry to web")
+        return
+
+    _init_services()
     updater = create_app(token)
     logger.info("Starting Bot...")
 
-    # Attach updater to downloader
+    downloader.updater = updater
     if monitor:
-        monitor.downloader.updater = updater
-        monitor.start()
+        updater.job_queue.run_repeating(monitor.poll, interval=MONITOR_INTERVAL, first=5, name="monitor")
 
-    # Inject updater into jobs
-    jobs_set_updater(updater)
+    # yt-dlp jobs upload through the same downloader /status reads
+    jobs_set_updater(updater, downloader)
 
-    # Start RSS loop in background if manager exists
+    # RSS: the feed manager decides per feed what is due on each tick
     if feed_manager:
-        t = threading.Thread(target=feed_manager.run_polling, daemon=True)
-        t.start()
+        updater.job_queue.run_repeating(_rss_job, interval=SCHEDULER_TICK, first=10, name="rss")
 
-    updater.start_polling()
+    if WEBHOOK_URL:
+        webhook_url = f"{WEBHOOK_URL.rstrip('/')}/{token}"
+        logger.info("Starting webhook on port %s", PORT)
+        updater.start_webhook(listen="0.0.0.0", port=PORT, url_path=token, webhook_url=webhook_url)
+    else:
+        # Long-poll: getUpdates blocks server-side for up to 30s
+        updater.start_polling(poll_interval=0.0, timeout=30, bootstrap_retries=-1, drop_pending_updates=False)
     updater.idle()
 
 if __name__ == '__main__':
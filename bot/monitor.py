@@ -6,9 +6,9 @@
 - Uses persistent state to avoid re-processing.
 """
 
-import time
 import logging
-import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any
 
 from bot.clients.realdebrid import RDClient, RealDebridNotConfigured
@@ -19,6 +19,9 @@ from bot.downloader import Downloader
 logger = logging.getLogger(__name__)
 
 POLL_INTERVAL = 20  # seconds
+UNRESTRICT_WORKERS = 8  # concurrent RD unrestrict calls per torrent
+
+_unrestrict_pool = ThreadPoolExecutor(max_workers=UNRESTRICT_WORKERS, thread_name_prefix="unrestrict")
 
 class Monitor:
     def __init__(self, downloader: Downloader, rd_client: Optional[RDClient] = None, sb_client: Optional[SeedboxClient] = None):
@@ -26,23 +29,18 @@ class Monitor:
         self.rd = rd_client
         self.sb = sb_client
         self.state = get_state()
-        self.running = False
-
-    def start(self):
-        """Start the polling loop in a background thread."""
-        self.running = True
-        t = threading.Thread(target=self._loop, daemon=True)
-        t.start()
-        logger.info("Monitor started polling.")
-
-    def _loop(self):
-        while self.running:
-            try:
-                self.check_realdebrid()
-                self.check_seedbox()
-            except Exception as e:
-                logger.error(f"Error in monitor loop: {e}")
-            time.sleep(POLL_INTERVAL)
+
+    def poll(self, context=None):
+        """Run one check of both services.
+
+        Scheduled every POLL_INTERVAL seconds as a JobQueue job (hence the
+        unused `context`); the queue never overlaps two runs of it.
+        """
+        try:
+            self.check_realdebrid()
+            self.check_seedbox()
+        except Exception as e:
+            logger.error("Error in monitor poll: %s", e)
 
     def check_realdebrid(self):
         if not self.rd: return
@@ -50,7 +48,7 @@ class Monitor:
             torrents = self.rd.list_torrents(limit=20)
             for t in torrents:
                 if t['status'] == 'waiting_files_selection':
-                    logger.info(f"Monitor: Auto-selecting files for RD torrent {t['filename']}")
+                    logger.info("Monitor: Auto-selecting files for RD torrent %s", t['filename'])
                     self.rd.select_files(t['id'])
                     continue
 
@@ -60,40 +58,58 @@ class Monitor:
                         continue
                     
                     # Unrestrict and download
-                    logger.info(f"Monitor: Found RD completion {t['filename']}")
-                    
-                    # Notify waiting stage
-                    self._notify_completion(f"rd_{tid}", t['filename'])
+                    logger.info("Monitor: Found RD completion %s", t['filename'])
                     
                     # Get info to find links
                     info = self.rd.get_torrent_info(tid)
                     links = info.get('links', [])
+
+                    # Leave the torrent unprocessed until all its links fit
+                    # in the download queue; the next poll retries it
+                    if len(links) > self.downloader.free_slots():
+                        logger.info("Monitor: download queue full, deferring RD torrent %s", t['filename'])
+                        continue
+
+                    # Notify waiting stage
+                    self._notify_completion(f"rd_{tid}", t['filename'])
                     
-                    # For simplicity, handle first link or all? 
-                    # Let's handle all unrestricted links
-                    for link in links:
+                    # Determine intent
+                    dest = self.state.get_intent(f"rd_{tid}") or "telegram"
+                    chat_id = self.state.get_intent_chat(f"rd_{tid}")
+
+                    # Unrestrict all links concurrently; enqueue in torrent order
+                    failed = 0
+                    for link, unrestricted in zip(links, _unrestrict_pool.map(self._unrestrict, links)):
+                        if unrestricted is None:
+                            failed += 1
+                            continue
                         try:
-                            unrestricted = self.rd.unrestrict_link(link, remote=True)
                             dl_url = unrestricted['download']
                             name = unrestricted['filename']
                             
-                            # Determine intent
-                            dest = self.state.get_intent(f"rd_{tid}") or "telegram"
-                            
                             # Get file size from unrestricted info
                             file_size = unrestricted.get('filesize', 0)
                             
                             # Trigger download
-                            self.downloader.process_item(dl_url, name, dest=dest, chat_id=None, size=file_size) 
-                            # Note: chat_id is None here because we don't know who added it.
-                            # Improvement: Store chat_id in state when adding torrent.
+                            self.downloader.process_item(dl_url, name, dest=dest, chat_id=chat_id, size=file_size)
                             
                         except Exception as e:
-                            logger.error(f"Failed to unrestrict/process RD link {link}: {e}")
+                            failed += 1
+                            logger.error("Failed to process RD link %s: %s", link, e)
+                    if failed:
+                        logger.warning("Monitor: %s/%s links failed for RD torrent %s", failed, len(links), t['filename'])
 
                     self.state.add_processed(f"rd_{tid}")
         except Exception as e:
-            logger.error(f"RD Monitor Error: {e}")
+            logger.error("RD Monitor Error: %s", e)
+
+    def _unrestrict(self, link):
+        """Unrestrict one RD link; returns None (and logs) on failure."""
+        try:
+            return self.rd.unrestrict_link(link, remote=True)
+        except Exception as e:
+            logger.error("Failed to unrestrict RD link %s: %s", link, e)
+            return None
 
     def check_seedbox(self):
         if not self.sb: return
@@ -107,7 +123,11 @@ class Monitor:
                     if self.state.is_processed(f"sb_{shash}"):
                         continue
                     
-                    logger.info(f"Monitor: Found Seedbox completion {t['name']}")
+                    logger.info("Monitor: Found Seedbox completion %s", t['name'])
+
+                    if self.downloader.free_slots() < 1:
+                        logger.info("Monitor: download queue full, deferring seedbox torrent %s", t['name'])
+                        continue
                     
                     # Notify waiting stage
                     self._notify_completion(f"sb_{shash}", t['name'])
@@ -116,7 +136,7 @@ class Monitor:
                     # List torrents now returns 'base_path' (full path on server)
                     base_path = t.get('base_path')
                     if not base_path:
-                         logger.warning(f"Seedbox torrent {t['name']} has no base_path")
+                         logger.warning("Seedbox torrent %s has no base_path", t['name'])
                          continue
 
                     # Construct SFTP URL (internal scheme handled by downloader)
@@ -124,19 +144,26 @@ class Monitor:
                     
                     # Determine intent
                     dest = self.state.get_intent(f"sb_{shash}") or "telegram"
+                    chat_id = self.state.get_intent_chat(f"sb_{shash}")
                     
                     # Get file size from torrent info
                     file_size = t.get('size', 0)
                     
-                    self.downloader.process_item(dl_url, t['name'], dest=dest, chat_id=None, size=file_size)
+                    try:
+                        self.downloader.process_item(dl_url, t['name'], dest=dest, chat_id=chat_id, size=file_size)
+                    except queue.Full:
+                        logger.info("Monitor: download queue full, deferring seedbox torrent %s", t['name'])
+                        continue
                     
                     self.state.add_processed(f"sb_{shash}")
                     
         except Exception as e:
-            logger.error(f"Seedbox Monitor Error: {e}")
+            logger.error("Seedbox Monitor Error: %s", e)
     
     def _notify_completion(self, item_id: str, name: str):
-        """Send notification that item is ready for download."""
-        # Try to get chat_id from state if stored
-        # For now, just log. Future: store chat_id when adding torrents.
-        logger.info(f"⏳ Ready for download: {name}")
+        """Log that an item is ready for download.
+
+        The requesting chat stored with the intent receives the upload
+        itself, through the chat_id passed to process_item.
+        """
+        logger.info("⏳ Ready for download: %s", name)
@@ -12,9 +12,17 @@ Features:
 Uses `bot.state` for persistent 'seen' item tracking to survive restarts.
 """
 
+import calendar
+import hashlib
+import heapq
+import re
 import time
 import logging
-from typing import Dict, Set, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Set, Optional, Callable, List, Tuple
+from urllib.parse import urlparse
+
+from bot.utils.http import get_session
 
 try:
     import feedparser
@@ -29,6 +37,65 @@ logger = logging.getLogger(__name__)
 
 # Polling interval defaults
 DEFAULT_POLL_INTERVAL = 600  # 10 mins
+FEED_FETCH_TIMEOUT = 30  # seconds
+MAX_BACKOFF = 8  # quiet feeds slow down to at most 8x their base interval
+MIN_BACKOFF = 0.25  # busy feeds speed up to at most 4x (never below MIN_POLL_INTERVAL)
+SCHEDULER_TICK = 60  # max sleep between scheduler passes
+MIN_POLL_INTERVAL = 5 * 60  # even very busy feeds are not polled faster than this
+MAX_POLL_INTERVAL = 24 * 3600  # never leave a feed unpolled for more than a day
+ENTRY_GAP_WINDOW = 7 * 86400  # only recent entries count towards a feed's cadence
+FEED_FETCH_WORKERS = 8
+
+_fetch_pool = ThreadPoolExecutor(max_workers=FEED_FETCH_WORKERS, thread_name_prefix="rss-fetch")
+
+_SY_PERIODS = {"hourly": 3600, "daily": 86400, "weekly": 7 * 86400, "monthly": 30 * 86400, "yearly": 365 * 86400}
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def _validators_from(resp) -> Dict[str, str]:
+    """ETag/Last-Modified cache validators present on a response."""
+    return {
+        k: v for k, v in (("etag", resp.headers.get("ETag")), ("last_modified", resp.headers.get("Last-Modified"))) if v
+    }
+
+
+def _entry_gap(entries, now: float) -> Optional[float]:
+    """Mean gap in seconds between entries published in the last
+    ENTRY_GAP_WINDOW, or None if there are fewer than two."""
+    stamps = []
+    for e in entries:
+        parsed = e.get('published_parsed') or e.get('updated_parsed')
+        if parsed:
+            ts = calendar.timegm(parsed)
+            if now - ts <= ENTRY_GAP_WINDOW:
+                stamps.append(ts)
+    if len(stamps) < 2:
+        return None
+    return (max(stamps) - min(stamps)) / (len(stamps) - 1)
+
+
+def _publisher_interval(d) -> int:
+    """Refresh interval (seconds) the publisher asks for, or 0 if none.
+
+    Takes the largest of <ttl> (minutes), sy:updatePeriod/updateFrequency
+    and the HTTP Cache-Control max-age.
+    """
+    hints = [0]
+    try:
+        hints.append(int(d.feed.get('ttl') or 0) * 60)
+    except (TypeError, ValueError):
+        pass
+    period = _SY_PERIODS.get(str(d.feed.get('sy_updateperiod', '')).strip().lower())
+    if period:
+        try:
+            freq = max(1, int(d.feed.get('sy_updatefrequency') or 1))
+        except (TypeError, ValueError):
+            freq = 1
+        hints.append(period // freq)
+    m = _MAX_AGE_RE.search(d.get('headers', {}).get('cache-control', ''))
+    if m:
+        hints.append(int(m.group(1)))
+    return max(hints)
 
 class FeedConfig:
     def __init__(self, url: str, forced_backend: Optional[str] = None, private_torrents: bool = False):
@@ -68,7 +135,7 @@ class Router:
                     # If RD not configured, fall back to seedbox
                     return 'sb'
                 except Exception as e:
-                    logger.warning(f"RD cache check failed: {e}. Falling back to Seedbox.")
+                    logger.warning("RD cache check failed: %s. Falling back to Seedbox.", e)
                     return 'sb'
             return 'sb'
 
@@ -81,54 +148,211 @@ class FeedManager:
         self.router = router
         self.feeds: Dict[str, FeedConfig] = {}
         self.state_manager = get_state()
+        # Shared keep-alive session so repeated polls reuse TCP/TLS connections
+        self.session = get_session()
+        # Adaptive scheduling: min-heap of (next_due, url) plus per-feed state
+        self._schedule: List[Tuple[float, str]] = []
+        self._scheduled: Set[str] = set()
+        self._backoff: Dict[str, float] = {}
+        self._ttl: Dict[str, int] = {}
+        self._gap: Dict[str, float] = {}
+        self._head_first: Set[str] = set()
+        self._body_hash: Dict[str, bytes] = {}
+        # Immutable snapshot for list_feeds(); rebuilt only after add/remove
+        self._feeds_cache: Optional[Tuple[FeedConfig, ...]] = None
 
     def add_feed(self, url: str, forced_backend: Optional[str] = None, private_torrents: bool = False):
         self.feeds[url] = FeedConfig(url, forced_backend, private_torrents)
+        self._feeds_cache = None
 
     def remove_feed(self, url: str):
         self.feeds.pop(url, None)
+        self._feeds_cache = None
+        # Drop per-feed scheduling state so a re-added feed starts fresh;
+        # its heap entry is discarded lazily by run_due
+        self._backoff.pop(url, None)
+        self._ttl.pop(url, None)
+        self._gap.pop(url, None)
+        self._body_hash.pop(url, None)
+        self._head_first.discard(url)
 
-    def list_feeds(self):
-        return list(self.feeds.values())
+    def list_feeds(self) -> Tuple[FeedConfig, ...]:
+        cache = self._feeds_cache
+        if cache is None:
+            cache = self._feeds_cache = tuple(self.feeds.values())
+        return cache
 
     def poll_once(self, on_decision: Optional[Callable[[str, Dict], None]] = None):
         """Poll all feeds once and call `on_decision(backend, entry)` for new items."""
         if feedparser is None:
             raise RuntimeError("feedparser is not installed")
-        
-        for url, cfg in self.feeds.items():
-            logger.info(f"Polling feed: {url}")
-            try:
-                d = feedparser.parse(url)
-            except Exception as e:
-                logger.error(f"Failed to parse feed {url}: {e}")
+
+        self._poll_by_host(list(self.feeds), on_decision)
+
+    def poll_feed(self, url: str, on_decision: Optional[Callable[[str, Dict], None]] = None) -> Optional[int]:
+        """Poll a single feed. Returns the number of new items, 0 if the feed
+        was not modified, or None if it could not be fetched."""
+        cfg = self.feeds.get(url)
+        if cfg is None:
+            return None
+        if feedparser is None:
+            raise RuntimeError("feedparser is not installed")
+
+        logger.info("Polling feed: %s", url)
+        try:
+            d = self._fetch(url)
+        except Exception as e:
+            logger.error("Failed to parse feed %s: %s", url, e)
+            return None
+        if d is None:
+            logger.debug("Feed %s not modified", url)
+            return 0
+
+        hint = _publisher_interval(d)
+        if hint > 0:
+            self._ttl[url] = hint
+        gap = _entry_gap(d.entries, time.time())
+        if gap is not None:
+            self._gap[url] = min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, gap))
+
+        new_items = 0
+        for e in d.entries:
+            # Unique ID: GUID > link > title
+            uid = e.get('id') or e.get('link') or e.get('guid') or e.get('title')
+            if not uid:
                 continue
 
-            for e in d.entries:
-                # Unique ID: GUID > link > title
-                uid = e.get('id') or e.get('link') or e.get('guid') or e.get('title')
-                if not uid:
-                    continue
-                
-                if self.state_manager.is_seen(url, uid):
-                    continue
-
-                # Mark as seen immediately to avoid processing loop if decision fails
-                self.state_manager.add_seen(url, uid)
-                
-                try:
-                    backend = self.router.decide(cfg, e)
-                    logger.info(f"Feed {url}: route {uid} -> {backend}")
-                    if on_decision:
-                        on_decision(backend, e)
-                except Exception as exc:
-                    logger.error(f"Error routing item {uid} from {url}: {exc}")
-
-    def run_polling(self, interval_sec: int = DEFAULT_POLL_INTERVAL, on_decision: Optional[Callable[[str, Dict], None]] = None):
-        logger.info(f"Starting RSS poll loop (interval={interval_sec}s)")
-        while True:
+            if self.state_manager.is_seen(url, uid):
+                continue
+
+            # Mark as seen immediately to avoid processing loop if decision fails
+            self.state_manager.add_seen(url, uid)
+            new_items += 1
+
+            try:
+                backend = self.router.decide(cfg, e)
+                logger.info("Feed %s: route %s -> %s", url, uid, backend)
+                if on_decision:
+                    on_decision(backend, e)
+            except Exception as exc:
+                logger.error("Error routing item %s from %s: %s", uid, url, exc)
+        return new_items
+
+    def _poll_by_host(self, urls: List[str], on_decision: Optional[Callable[[str, Dict], None]]) -> Dict[str, Optional[int]]:
+        """Poll `urls` with one pool task per host; returns {url: poll_feed result}.
+
+        Hosts are polled in parallel while each host's feeds run back to
+        back, so a host sees one request at a time and a slow host only
+        delays its own feeds.
+        """
+        by_host: Dict[str, List[str]] = {}
+        for url in urls:
+            by_host.setdefault(urlparse(url).netloc.lower(), []).append(url)
+        futures = [_fetch_pool.submit(self._poll_host, host_urls, on_decision) for host_urls in by_host.values()]
+        results: Dict[str, Optional[int]] = {}
+        for fut in futures:
+            results.update(fut.result())
+        return results
+
+    def _poll_host(self, urls: List[str], on_decision: Optional[Callable[[str, Dict], None]]) -> Dict[str, Optional[int]]:
+        results = {}
+        for url in urls:
             try:
-                self.poll_once(on_decision=on_decision)
+                results[url] = self.poll_feed(url, on_decision)
             except Exception as exc:
-                logger.exception('Uncaught error during RSS polling: %s', exc)
-            time.sleep(interval_sec)
+                logger.exception('Uncaught error polling feed %s: %s', url, exc)
+                results[url] = None
+        return results
+
+    def _fetch(self, url: str):
+        """Download `url` over the pooled session and parse it with feedparser.
+
+        Sends the feed's stored ETag/Last-Modified as a conditional GET and
+        returns None on 304 Not Modified, or when the body is byte-identical
+        to the last one parsed, skipping the parse.
+        """
+        validators = self.state_manager.get_feed_validators(url)
+        req_headers = {"User-Agent": feedparser.USER_AGENT}
+        if validators.get("etag"):
+            req_headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            req_headers["If-Modified-Since"] = validators["last_modified"]
+
+        if validators and url in self._head_first:
+            head = self.session.head(url, headers=req_headers, timeout=FEED_FETCH_TIMEOUT, allow_redirects=True)
+            if head.status_code == 304 or (head.ok and _validators_from(head) == validators):
+                return None
+
+        resp = self.session.get(url, headers=req_headers, timeout=FEED_FETCH_TIMEOUT)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+
+        fresh = _validators_from(resp)
+        if resp.status_code == 200 and validators and fresh == validators:
+            # Unchanged validators but a full body: the server ignores
+            # conditional GET, so revalidate with a cheap HEAD from now on.
+            self._head_first.add(url)
+        # A 304 may still rotate the validators; keep whatever the server
+        # sent last so we never resend a stale ETag forever.
+        new_validators = {**validators, **fresh} if resp.status_code == 304 else fresh
+        if new_validators != validators:
+            self.state_manager.set_feed_validators(url, new_validators)
+        if resp.status_code == 304:
+            return None
+
+        # Byte-identical body (e.g. no validators at all): nothing new to parse
+        digest = hashlib.blake2b(resp.content, digest_size=16).digest()
+        if self._body_hash.get(url) == digest:
+            return None
+        self._body_hash[url] = digest
+
+        headers = {k.lower(): v for k, v in resp.headers.items()}
+        headers.setdefault("content-location", resp.url)  # base for relative links
+        return feedparser.parse(resp.content, response_headers=headers)
+
+    def _next_delay(self, url: str, new_items: Optional[int], interval_sec: int) -> float:
+        """Seconds until `url` is polled again.
+
+        The multiplier doubles (up to MAX_BACKOFF) while the feed is quiet or
+        failing and halves (down to MIN_BACKOFF) each time it yields new
+        items, so busy feeds speed up gradually instead of jumping back.
+        """
+        prev = self._backoff.get(url, 1)
+        backoff = max(MIN_BACKOFF, prev / 2) if new_items else min(MAX_BACKOFF, prev * 2)
+        self._backoff[url] = backoff
+        # Observed posting cadence replaces the configured interval; the
+        # publisher's own hint is a floor we never poll faster than.
+        ttl = self._ttl.get(url, 0)
+        base = max(ttl, self._gap.get(url, interval_sec))
+        floor = max(ttl, min(base, MIN_POLL_INTERVAL))
+        return min(MAX_POLL_INTERVAL, max(floor, base * backoff))
+
+    def run_due(self, interval_sec: int = DEFAULT_POLL_INTERVAL, on_decision: Optional[Callable[[str, Dict], None]] = None) -> float:
+        """Poll every feed whose next-due time has passed.
+
+        Returns how long the caller can sleep before something is due
+        (capped at SCHEDULER_TICK so newly added feeds are picked up).
+        """
+        now = time.monotonic()
+        for url in list(self.feeds):
+            if url not in self._scheduled:
+                heapq.heappush(self._schedule, (now, url))
+                self._scheduled.add(url)
+
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            _, url = heapq.heappop(self._schedule)
+            if url not in self.feeds:
+                self._scheduled.discard(url)
+                continue
+            due.append(url)
+
+        # Fetches are network-bound; overlap them across hosts
+        results = self._poll_by_host(due, on_decision)
+        for url in due:
+            delay = self._next_delay(url, results.get(url), interval_sec)
+            heapq.heappush(self._schedule, (time.monotonic() + delay, url))
+
+        if not self._schedule:
+            return SCHEDULER_TICK
+        return max(0.0, min(SCHEDULER_TICK, self._schedule[0][0] - time.monotonic()))
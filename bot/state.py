@@ -1,7 +1,10 @@
 import os
 import json
 import logging
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List
 
@@ -10,8 +13,25 @@ try:
 except ImportError:
     redis = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+
+def _dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def _loads(data):
+    # Both parsers accept str or bytes
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
 # ─────────────────────────────────────────────
 # ABSTRACT BASE
 # ─────────────────────────────────────────────
@@ -46,13 +66,21 @@ class StateManager(ABC):
         pass
 
     @abstractmethod
-    def set_intent(self, item_id: str, dest: str):
+    def set_intent(self, item_id: str, dest: str, chat_id: Optional[int] = None):
         pass
 
     @abstractmethod
     def get_intent(self, item_id: str) -> Optional[str]:
         pass
 
+    @abstractmethod
+    def get_intent_chat(self, item_id: str) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    def clear_intent(self, item_id: str):
+        pass
+
     # ───────── NEW (UPLOAD RESUME) ─────────
 
     @abstractmethod
@@ -63,6 +91,17 @@ class StateManager(ABC):
     def mark_uploaded(self, file_hash: str, dest: str, meta: Dict[str, Any]):
         pass
 
+    # ───────── RSS CONDITIONAL GET ─────────
+
+    @abstractmethod
+    def get_feed_validators(self, feed_url: str) -> Dict[str, str]:
+        """Return stored {'etag': ..., 'last_modified': ...} for a feed (may be empty)."""
+        pass
+
+    @abstractmethod
+    def set_feed_validators(self, feed_url: str, validators: Dict[str, str]):
+        pass
+
 
 # ─────────────────────────────────────────────
 # REDIS IMPLEMENTATION (PRODUCTION)
@@ -84,17 +123,17 @@ class RedisState(StateManager):
         self.r.sadd(f"rss:seen:{feed_url}", item_id)
 
     def set_job(self, job_id: str, data: Dict[str, Any]):
-        self.r.set(f"job:{job_id}", json.dumps(data), ex=86400)
+        self.r.set(f"job:{job_id}", _dumps(data), ex=86400)
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         v = self.r.get(f"job:{job_id}")
-        return json.loads(v) if v else None
+        return _loads(v) if v else None
 
     def list_jobs(self) -> Dict[str, Dict[str, Any]]:
         out = {}
         for k in self.r.keys("job:*"):
             job_id = k.split(":", 1)[1]
-            out[job_id] = json.loads(self.r.get(k))
+            out[job_id] = _loads(self.r.get(k))
         return out
 
     def add_processed(self, item_id: str):
@@ -103,12 +142,23 @@ class RedisState(StateManager):
     def is_processed(self, item_id: str) -> bool:
         return bool(self.r.sismember("processed_torrents", item_id))
 
-    def set_intent(self, item_id: str, dest: str):
-        self.r.set(f"intent:{item_id}", dest)
+    def set_intent(self, item_id: str, dest: str, chat_id: Optional[int] = None):
+        pipe = self.r.pipeline()
+        pipe.set(f"intent:{item_id}", dest)
+        if chat_id is not None:
+            pipe.set(f"intent_chat:{item_id}", chat_id)
+        pipe.execute()
 
     def get_intent(self, item_id: str) -> Optional[str]:
         return self.r.get(f"intent:{item_id}")
 
+    def get_intent_chat(self, item_id: str) -> Optional[int]:
+        v = self.r.get(f"intent_chat:{item_id}")
+        return int(v) if v else None
+
+    def clear_intent(self, item_id: str):
+        self.r.delete(f"intent:{item_id}", f"intent_chat:{item_id}")
+
     # ───────── UPLOAD RESUME ─────────
 
     def is_uploaded(self, file_hash: str, dest: str) -> bool:
@@ -116,16 +166,103 @@ class RedisState(StateManager):
         data = self.r.get(key)
         if not data:
             return False
-        return bool(json.loads(data).get(dest))
+        return bool(_loads(data).get(dest))
 
     def mark_uploaded(self, file_hash: str, dest: str, meta: Dict[str, Any]):
         key = f"upload:{file_hash}"
         data = self.r.get(key)
-        payload = json.loads(data) if data else {}
+        payload = _loads(data) if data else {}
         payload.update(meta)
         payload[dest] = True
         payload["ts"] = int(time.time())
-        self.r.set(key, json.dumps(payload))
+        self.r.set(key, _dumps(payload))
+
+    # ───────── RSS CONDITIONAL GET ─────────
+
+    def get_feed_validators(self, feed_url: str) -> Dict[str, str]:
+        return self.r.hgetall(f"rss:validators:{feed_url}")
+
+    def set_feed_validators(self, feed_url: str, validators: Dict[str, str]):
+        key = f"rss:validators:{feed_url}"
+        pipe = self.r.pipeline()
+        pipe.delete(key)
+        if validators:
+            pipe.hset(key, mapping=validators)
+        pipe.execute()
+
+
+# ─────────────────────────────────────────────
+# SQLITE JOB STORE (USED BY JSON FALLBACK)
+# ─────────────────────────────────────────────
+
+JOB_TTL = 86400  # seconds; matches the Redis job expiry
+JOB_CACHE_SIZE = 512
+FINISHED_JOB_STATUSES = ("done", "failed", "timeout", "error")
+
+
+class SqliteJobStore:
+    """Job records in a WAL-mode SQLite table with a small LRU read cache.
+
+    Keeps job history out of the JSON state file (which is rewritten on
+    every change) and drops finished jobs older than JOB_TTL.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT, status TEXT, ts REAL)"
+        )
+        self._conn.commit()
+
+    def _remember(self, job_id: str, data: Dict[str, Any]):
+        self._cache[job_id] = data
+        self._cache.move_to_end(job_id)
+        if len(self._cache) > JOB_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def set(self, job_id: str, data: Dict[str, Any]):
+        now = time.time()
+        status = data.get("status")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, status, ts) VALUES (?, ?, ?, ?)",
+                (job_id, _dumps(data), status, now),
+            )
+            if status in FINISHED_JOB_STATUSES:
+                self._prune(now)
+            self._conn.commit()
+            self._remember(job_id, dict(data))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the job; changes only persist through set()."""
+        with self._lock:
+            if job_id in self._cache:
+                self._cache.move_to_end(job_id)
+                return dict(self._cache[job_id])
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row:
+                return None
+            data = _loads(row[0])
+            self._remember(job_id, data)
+            return dict(data)
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, data FROM jobs").fetchall()
+        return {job_id: _loads(data) for job_id, data in rows}
+
+    def _prune(self, now: float):
+        placeholders = ",".join("?" * len(FINISHED_JOB_STATUSES))
+        cur = self._conn.execute(
+            f"DELETE FROM jobs WHERE ts < ? AND status IN ({placeholders})",
+            (now - JOB_TTL, *FINISHED_JOB_STATUSES),
+        )
+        if cur.rowcount:
+            self._cache.clear()
 
 
 # ─────────────────────────────────────────────
@@ -133,73 +270,121 @@ class RedisState(StateManager):
 # ─────────────────────────────────────────────
 
 class JsonFileState(StateManager):
-    def __init__(self, filepath: str = "state.json"):
+    def __init__(self, filepath: str = "state.json", jobs_db: Optional[str] = None):
         self.filepath = filepath
         self.data = {
-            "seen": {},
-            "jobs": {},
-            "processed": [],
+            "seen": {},         # feed_url -> set of item ids
+            "processed": set(),
             "intents": {},
+            "intent_chats": {},
             "uploads": {},   # ← NEW
+            "feed_validators": {},
         }
+        self.jobs = SqliteJobStore(jobs_db or os.path.splitext(filepath)[0] + ".jobs.db")
+        # Download workers, the monitor and RSS polling all write here
+        self._lock = threading.RLock()
         self._load()
         logger.info(f"Using local file {filepath} for state persistence")
 
     def _load(self):
         if os.path.exists(self.filepath):
             try:
-                with open(self.filepath, "r") as f:
-                    self.data.update(json.load(f))
+                with open(self.filepath, "rb") as f:
+                    self.data.update(_loads(f.read()))
             except Exception as e:
                 logger.error(f"Failed to load state file: {e}")
+        # Stored as JSON arrays; keep them as sets for O(1) membership checks
+        self.data["seen"] = {url: set(ids) for url, ids in self.data.get("seen", {}).items()}
+        self.data["processed"] = set(self.data.get("processed", ()))
+        # Migrate jobs written by older versions into the job store
+        legacy_jobs = self.data.pop("jobs", None)
+        if legacy_jobs:
+            for job_id, job in legacy_jobs.items():
+                if self.jobs.get(job_id) is None:
+                    self.jobs.set(job_id, job)
 
     def _save(self):
-        with open(self.filepath, "w") as f:
-            json.dump(self.data, f, indent=2)
+        # Write to a temp file and swap it in so a crash mid-write (or a
+        # concurrent reader) never sees a truncated state file.
+        tmp = self.filepath + ".tmp"
+        with self._lock:
+            if orjson is not None:
+                with open(tmp, "wb") as f:
+                    f.write(orjson.dumps(self.data, option=orjson.OPT_INDENT_2, default=list))
+            else:
+                with open(tmp, "w") as f:
+                    json.dump(self.data, f, indent=2, default=list)
+            os.replace(tmp, self.filepath)
 
     # Existing methods unchanged
     def is_seen(self, feed_url: str, item_id: str) -> bool:
-        return item_id in self.data["seen"].get(feed_url, [])
+        return item_id in self.data["seen"].get(feed_url, ())
 
     def add_seen(self, feed_url: str, item_id: str):
-        self.data.setdefault("seen", {}).setdefault(feed_url, []).append(item_id)
-        self._save()
+        with self._lock:
+            self.data["seen"].setdefault(feed_url, set()).add(item_id)
+            self._save()
 
     def set_job(self, job_id: str, data: Dict[str, Any]):
-        self.data["jobs"][job_id] = data
-        self._save()
+        self.jobs.set(job_id, data)
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        return self.data["jobs"].get(job_id)
+        return self.jobs.get(job_id)
 
     def list_jobs(self) -> Dict[str, Dict[str, Any]]:
-        return self.data.get("jobs", {})
+        return self.jobs.all()
 
     def add_processed(self, item_id: str):
-        self.data.setdefault("processed", []).append(item_id)
-        self._save()
+        with self._lock:
+            self.data["processed"].add(item_id)
+            self._save()
 
     def is_processed(self, item_id: str) -> bool:
-        return item_id in self.data.get("processed", [])
+        return item_id in self.data["processed"]
 
-    def set_intent(self, item_id: str, dest: str):
-        self.data.setdefault("intents", {})[item_id] = dest
-        self._save()
+    def set_intent(self, item_id: str, dest: str, chat_id: Optional[int] = None):
+        # Destination and chat land in the same save
+        with self._lock:
+            self.data.setdefault("intents", {})[item_id] = dest
+            if chat_id is not None:
+                self.data.setdefault("intent_chats", {})[item_id] = chat_id
+            self._save()
 
     def get_intent(self, item_id: str) -> Optional[str]:
         return self.data.get("intents", {}).get(item_id)
 
+    def get_intent_chat(self, item_id: str) -> Optional[int]:
+        return self.data.get("intent_chats", {}).get(item_id)
+
+    def clear_intent(self, item_id: str):
+        with self._lock:
+            dest = self.data.get("intents", {}).pop(item_id, None)
+            chat = self.data.get("intent_chats", {}).pop(item_id, None)
+            if dest is not None or chat is not None:
+                self._save()
+
     # ───────── UPLOAD RESUME ─────────
 
     def is_uploaded(self, file_hash: str, dest: str) -> bool:
         return bool(self.data.get("uploads", {}).get(file_hash, {}).get(dest))
 
     def mark_uploaded(self, file_hash: str, dest: str, meta: Dict[str, Any]):
-        entry = self.data.setdefault("uploads", {}).setdefault(file_hash, {})
-        entry.update(meta)
-        entry[dest] = True
-        entry["ts"] = int(time.time())
-        self._save()
+        with self._lock:
+            entry = self.data.setdefault("uploads", {}).setdefault(file_hash, {})
+            entry.update(meta)
+            entry[dest] = True
+            entry["ts"] = int(time.time())
+            self._save()
+
+    # ───────── RSS CONDITIONAL GET ─────────
+
+    def get_feed_validators(self, feed_url: str) -> Dict[str, str]:
+        return dict(self.data.get("feed_validators", {}).get(feed_url, {}))
+
+    def set_feed_validators(self, feed_url: str, validators: Dict[str, str]):
+        with self._lock:
+            self.data.setdefault("feed_validators", {})[feed_url] = dict(validators)
+            self._save()
 
 
 # ─────────────────────────────────────────────
@@ -207,10 +392,10 @@ class JsonFileState(StateManager):
 # ─────────────────────────────────────────────
 
 def get_state() -> StateManager:
-    from bot.config import REDIS_URL
+    from bot.config import REDIS_URL, STATE_FILE
     if REDIS_URL:
         try:
             return RedisState(REDIS_URL)
         except Exception as e:
             logger.warning(f"Redis failed, falling back to file: {e}")
-    return JsonFileState()
+    return JsonFileState(STATE_FILE)
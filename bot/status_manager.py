@@ -6,7 +6,7 @@ import time
 import threading
 from typing import Dict, Tuple, Optional, Callable
 from telegram import Bot
-from telegram.error import BadRequest, Unauthorized
+from telegram.error import BadRequest, RetryAfter, Unauthorized
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +29,12 @@ class StatusManager:
         """Set the function that generates status text."""
         self._status_generator = func
 
-    def start_live_status(self, user_id: int, chat_id: int, message_id: int):
-        """Start auto-updating a status message."""
+    def start_live_status(self, user_id: int, chat_id: int, message_id: int, text: Optional[str] = None):
+        """Start auto-updating a status message.
+
+        `text` is what the message currently shows; edits are only sent when
+        the generated text differs from it.
+        """
         # Cancel old task if exists
         self.stop_live_status(user_id, chat_id)
 
@@ -40,7 +44,7 @@ class StatusManager:
         # Start new update thread
         thread = threading.Thread(
             target=self._auto_update_loop,
-            args=(user_id, chat_id, message_id, stop_event),
+            args=(user_id, chat_id, message_id, stop_event, text),
             daemon=True
         )
 
@@ -66,7 +70,8 @@ class StatusManager:
                 except (BadRequest, Unauthorized) as e:
                     logger.debug(f"Could not delete old status message: {e}")
 
-    def _auto_update_loop(self, user_id: int, chat_id: int, message_id: int, stop_event: threading.Event):
+    def _auto_update_loop(self, user_id: int, chat_id: int, message_id: int, stop_event: threading.Event,
+                          last_text: Optional[str] = None):
         """Background loop that updates the status message every 60 seconds."""
         try:
             while not stop_event.is_set():
@@ -87,6 +92,10 @@ class StatusManager:
                     logger.error(f"Error generating status text: {e}")
                     break
 
+                # Skip the API round trip when nothing changed
+                if status_text == last_text:
+                    continue
+
                 # Update message
                 try:
                     self._bot.edit_message_text(
@@ -95,6 +104,7 @@ class StatusManager:
                         text=status_text,
                         parse_mode="Markdown"
                     )
+                    last_text = status_text
                     logger.debug(f"Updated status message {message_id}")
                 except BadRequest as e:
                     if "message is not modified" in str(e).lower():
@@ -102,6 +112,11 @@ class StatusManager:
                     else:
                         logger.warning(f"Failed to update status: {e}")
                         break
+                except RetryAfter as e:
+                    # Flood control: skip this tick and wait out the penalty
+                    logger.warning(f"Status edits rate-limited, retrying in {e.retry_after}s")
+                    if stop_event.wait(e.retry_after):
+                        return
                 except Unauthorized:
                     logger.warning("Bot blocked by user, stopping updates")
                     break
@@ -2,6 +2,11 @@ import asyncio
 import threading
 import logging
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 logger = logging.getLogger(__name__)
 
 _loop = None
@@ -19,7 +24,8 @@ def get_telegram_loop() -> asyncio.AbstractEventLoop:
     if _loop:
         return _loop
 
-    _loop = asyncio.new_event_loop()
+    # libuv-backed loop for Telethon's MTProto sockets when available
+    _loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
     _thread = threading.Thread(
         target=_run_loop,
         args=(_loop,),
@@ -24,7 +24,7 @@ from bot.config import (
 
 logger = logging.getLogger(__name__)
 
-VIDEO_EXTS = (".mp4", ".mkv", ".avi", ".mov", ".m4v", ".webm")
+VIDEO_EXTS = frozenset({".mp4", ".mkv", ".avi", ".mov", ".m4v", ".webm"})
 
 # ─────────────────────────────────────────────
 # GLOBAL SINGLETON TELETHON CLIENT
@@ -76,11 +76,13 @@ class TelethonUploader:
         caption: Optional[str] = None,
         thumb_path: Optional[str] = None,
         progress_callback: Optional[Callable[[int, int], None]] = None,
+        file_size: Optional[int] = None,
     ):
         client = await _get_client()
 
         file_name = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path)
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
         ext = os.path.splitext(file_name)[1].lower()
 
         is_video = ext in VIDEO_EXTS
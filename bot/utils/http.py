@@ -0,0 +1,29 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Enough pooled connections per host for the handler, monitor and download threads
+POOL_MAXSIZE = 32
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide requests.Session shared by RD, RSS and HTTP downloads.
+
+    Reusing one keep-alive pool avoids a TCP+TLS handshake per request.
+    requests already advertises gzip/deflate; with `brotli` installed
+    urllib3 adds and transparently decodes `br` as well.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
@@ -0,0 +1,30 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens/sec up to `capacity`.
+
+    `take()` blocks until enough tokens are available instead of failing,
+    so callers are smoothed out under the upstream rate limit.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, n: float = 1) -> None:
+        """Consume `n` tokens, sleeping until they have been refilled."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
@@ -9,6 +9,9 @@ logger = logging.getLogger(__name__)
 # 1.9 GB to be safe
 CHUNK_SIZE = 1900 * 1024 * 1024 
 
+# Video extensions that ffmpeg should handle
+_VIDEO_EXTS = frozenset({'.mp4', '.mkv', '.avi', '.mov', '.m4v', '.flv', '.wmv'})
+
 def split_file(path: str) -> List[str]:
     """Split a file into parts if it exceeds CHUNK_SIZE.
     Returns a list of paths to the parts.
@@ -18,8 +21,7 @@ def split_file(path: str) -> List[str]:
         return [path]
 
     ext = os.path.splitext(path)[1].lower()
-    # Video extensions that ffmpeg should handle
-    if ext in ['.mp4', '.mkv', '.avi', '.mov', '.m4v', '.flv', '.wmv']:
+    if ext in _VIDEO_EXTS:
         return _split_video(path)
     else:
         return _split_binary(path)
@@ -49,8 +51,10 @@ def _split_binary(path: str) -> List[str]:
             
             if bytes_written == 0:
                 # No more data read, delete the empty part file and break
-                if os.path.exists(part_path):
+                try:
                     os.remove(part_path)
+                except FileNotFoundError:
+                    pass
                 break
                 
             parts.append(part_path)
@@ -0,0 +1,34 @@
+import subprocess
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+def run_tail(cmd: List[str], timeout: Optional[float] = None, tail_lines: int = 50) -> Tuple[int, str]:
+    """Run `cmd` keeping only the last `tail_lines` lines of stderr.
+
+    stdout is discarded, so memory stays bounded however long the process
+    runs. Returns (returncode, stderr_tail). On timeout the process is
+    killed and subprocess.TimeoutExpired is raised.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        bufsize=1,
+    )
+    ring = deque(maxlen=tail_lines)
+    reader = threading.Thread(target=ring.extend, args=(proc.stderr,), daemon=True)
+    reader.start()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        reader.join(timeout=5)
+        proc.stderr.close()
+    return proc.returncode, "".join(ring)
@@ -1,18 +1,24 @@
 import os
+import shutil
 import subprocess
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+FFMPEG_TIMEOUT = 60  # seconds; a hung ffmpeg is killed and no thumbnail is used
+
+@lru_cache(maxsize=1)
+def _has_ffmpeg() -> bool:
+    """Look ffmpeg up once instead of spawning `ffmpeg -version` per thumbnail."""
+    return shutil.which("ffmpeg") is not None
+
 def generate_thumbnail(video_path: str) -> str:
     """Generates a JPG thumbnail for a video file. Returns path to thumbnail or None."""
     if not os.path.exists(video_path):
         return None
 
-    # Check for ffmpeg
-    try:
-        subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
-    except Exception:
+    if not _has_ffmpeg():
         logger.warning("ffmpeg not found, thumbnail generation skipped")
         return None
 
@@ -31,7 +37,7 @@ def generate_thumbnail(video_path: str) -> str:
     
     try:
         # Run quietly
-        subprocess.run(cmd, capture_output=True, check=True)
+        subprocess.run(cmd, capture_output=True, check=True, timeout=FFMPEG_TIMEOUT)
         if os.path.exists(thumb_path):
             return thumb_path
     except Exception as e:
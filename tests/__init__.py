@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Importing bot.jobs opens the state store; keep test state out of the repo
+os.environ["STATE_FILE"] = os.path.join(tempfile.mkdtemp(prefix="bot-tests-"), "state.json")
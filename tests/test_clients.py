@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import unittest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -29,6 +30,15 @@ class TestClients(unittest.TestCase):
             if old_user: os.environ['RUTORRENT_USER'] = old_user
             if old_pass: os.environ['RUTORRENT_PASS'] = old_pass
 
+    def test_seedbox_proxy_per_thread(self):
+        client = seedbox.SeedboxClient(url='https://host/RPC2', user='u', password='p')
+        self.assertIs(client.server, client.server)
+        other = []
+        t = threading.Thread(target=lambda: other.append(client.server))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], client.server)
+
 
 if __name__ == '__main__':
     unittest.main()
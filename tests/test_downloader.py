@@ -0,0 +1,175 @@
+import os
+import queue
+import sys
+import shutil
+import stat
+import tempfile
+import unittest
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock, patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bot import downloader as downloader_mod
+from bot.downloader import Downloader, list_local_files, build_rclone_cmd, RCLONE_LARGE_FILE
+
+
+class TestTaskStatus(unittest.TestCase):
+    def setUp(self):
+        self.d = Downloader()
+        self.d._register_task('t1', 'file.bin', 'downloading')
+
+    def test_progress_updates_are_coalesced(self):
+        self.d._update_task_status('t1', 'downloading', progress=10.0)
+        self.d._update_task_status('t1', 'downloading', progress=20.0)
+        self.assertEqual(self.d.get_active_tasks()['t1']['progress_percent'], 10.0)
+
+    def test_status_change_always_written(self):
+        self.d._update_task_status('t1', 'downloading', progress=10.0)
+        self.d._update_task_status('t1', 'uploading')
+        self.assertEqual(self.d.get_active_tasks()['t1']['status'], 'uploading')
+
+    def test_total_files_always_written(self):
+        self.d._update_task_status('t1', 'downloading', progress=10.0)
+        self.d._update_task_status('t1', 'downloading', total_files=5, uploaded_files=0)
+        self.assertEqual(self.d.get_active_tasks()['t1']['total_files'], 5)
+
+    def test_uploaded_files_change_always_written(self):
+        self.d._update_task_status('t1', 'downloading', total_files=3, uploaded_files=0)
+        self.d._update_task_status('t1', 'downloading', uploaded_files=1)
+        self.d._update_task_status('t1', 'downloading', uploaded_files=2)
+        self.assertEqual(self.d.get_active_tasks()['t1']['uploaded_files'], 2)
+
+    def test_final_progress_always_written(self):
+        self.d._update_task_status('t1', 'downloading', progress=10.0)
+        self.d._update_task_status('t1', 'downloading', progress=100.0)
+        self.assertEqual(self.d.get_active_tasks()['t1']['progress_percent'], 100.0)
+
+    def test_coalesced_ticks_skip_the_lock(self):
+        self.d._update_task_status('t1', 'downloading', progress=10.0)
+        self.d._lock = MagicMock()
+        for pct in range(11, 20):
+            self.d._update_task_status('t1', 'downloading', progress=float(pct))
+        self.d._lock.__enter__.assert_not_called()
+
+    def test_unknown_task_ignored(self):
+        self.d._update_task_status('missing', 'downloading')
+        self.assertNotIn('missing', self.d.get_active_tasks())
+
+
+class TestWorkQueue(unittest.TestCase):
+    def test_process_item_runs_on_worker_pool(self):
+        d = Downloader()
+        d._process_item_worker = Mock()
+        d.process_item('http://x/file.bin', 'file.bin', dest='gdrive', size=10)
+        downloader_mod._work_queue.join()
+        args = d._process_item_worker.call_args.args
+        self.assertEqual(args[1:], ('http://x/file.bin', 'file.bin', 'gdrive', None, 10))
+        self.assertEqual(d.get_active_tasks()[args[0]]['status'], 'queued')
+
+    @patch('bot.downloader._ensure_workers')
+    @patch('bot.downloader._work_queue', queue.Queue(maxsize=1))
+    def test_full_queue_raises_instead_of_blocking(self, _):
+        d = Downloader()
+        d.process_item('http://x/a.bin', 'a.bin')
+        self.assertEqual(d.free_slots(), 0)
+        with self.assertRaises(queue.Full):
+            d.process_item('http://x/b.bin', 'b.bin')
+        self.assertEqual([t['name'] for t in d.get_active_tasks().values()], ['a.bin'])
+
+
+class TestListLocalFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_recurses_and_reports_sizes(self):
+        os.makedirs(os.path.join(self.tmpdir, 'sub'))
+        with open(os.path.join(self.tmpdir, 'a.bin'), 'wb') as f:
+            f.write(b'0' * 10)
+        with open(os.path.join(self.tmpdir, 'sub', 'b.bin'), 'wb') as f:
+            f.write(b'0' * 20)
+        files = dict(list_local_files(self.tmpdir))
+        self.assertEqual(files, {
+            os.path.join(self.tmpdir, 'a.bin'): 10,
+            os.path.join(self.tmpdir, 'sub', 'b.bin'): 20,
+        })
+
+
+class FakeSFTP:
+    def __init__(self, tree):
+        self.tree = tree
+        self.listed = []
+
+    def listdir_attr(self, path):
+        self.listed.append(path)
+        return [
+            SimpleNamespace(filename=name, st_mode=stat.S_IFDIR if kind == 'dir' else stat.S_IFREG)
+            for name, kind in self.tree[path]
+        ]
+
+
+class TestWalkSFTP(unittest.TestCase):
+    def test_single_listing_per_directory(self):
+        sftp = FakeSFTP({
+            '/r': [('a.mkv', 'file'), ('sub', 'dir')],
+            '/r/sub': [('b.srt', 'file')],
+        })
+        files = Downloader()._walk_sftp(sftp, '/r')
+        self.assertEqual(
+            sorted((remote, rel) for remote, rel, _ in files),
+            [('/r/a.mkv', 'a.mkv'), ('/r/sub/b.srt', os.path.join('sub', 'b.srt'))],
+        )
+        self.assertEqual(sorted(sftp.listed), ['/r', '/r/sub'])
+
+
+class TestRcloneCmd(unittest.TestCase):
+    def test_default_chunk_size(self):
+        cmd = build_rclone_cmd('/tmp/does-not-exist.bin', 1024)
+        self.assertIn('--drive-chunk-size=128M', cmd)
+        self.assertIn('--transfers=8', cmd)
+        self.assertNotIn('--fast-list', cmd)
+
+    def test_large_file_chunk_size(self):
+        cmd = build_rclone_cmd('/tmp/does-not-exist.bin', RCLONE_LARGE_FILE + 1)
+        self.assertIn('--drive-chunk-size=256M', cmd)
+        self.assertNotIn('--drive-chunk-size=128M', cmd)
+
+
+class TestThumbnailPrefetch(unittest.TestCase):
+    @patch('bot.downloader.generate_thumbnail', return_value=None)
+    def test_only_videos_get_thumbnails(self, mock_thumb):
+        futs = Downloader()._prefetch_thumbnails(['/x/a.MKV', '/x/b.srt', '/x/c.mp4'])
+        self.assertEqual(sorted(futs), ['/x/a.MKV', '/x/c.mp4'])
+        for fut in futs.values():
+            fut.result(timeout=5)
+        self.assertEqual(mock_thumb.call_count, 2)
+
+    def test_late_thumbnail_is_skipped(self):
+        with patch('bot.downloader.THUMB_WAIT', 0.05):
+            self.assertIsNone(downloader_mod._resolve_thumb(Future()))
+
+    @patch('bot.downloader.get_state')
+    @patch('bot.downloader.generate_thumbnail', return_value=None)
+    def test_thumbnails_requested_just_ahead(self, mock_thumb, _state):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for i in range(5):
+                with open(os.path.join(tmpdir, f'{i}.mkv'), 'wb') as f:
+                    f.write(b'x')
+            d = Downloader()
+            requested_at_upload = []
+            d._upload_single_file = lambda *a: requested_at_upload.append(mock_thumb.call_count)
+            with patch('bot.downloader.hash_file', return_value=''):
+                d._upload(tmpdir, 'pack', 'telegram', 1, 't1')
+            # Never more than THUMB_LOOKAHEAD thumbnails beyond the current file
+            for idx, requested in enumerate(requested_at_upload, 1):
+                self.assertLessEqual(requested, idx - 1 + downloader_mod.THUMB_LOOKAHEAD)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,12 +4,13 @@ import unittest
 from unittest.mock import patch, Mock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from bot.jobs import enqueue_ytdl, job_status
+import bot.jobs
+from bot.jobs import enqueue_ytdl, job_status, active_job_ids, set_updater
 
 
 class TestJobs(unittest.TestCase):
     @patch('bot.jobs._executor')
-    @patch('bot.jobs.subprocess.run')
+    @patch('bot.jobs.run_tail')
     def test_enqueue_ytdl_runs_and_records(self, mock_run, mock_executor):
         # Setup synchronous execution for the test
         def side_effect(fn, *args, **kwargs):
@@ -17,9 +18,7 @@ class TestJobs(unittest.TestCase):
             return Mock()
         mock_executor.submit.side_effect = side_effect
 
-        mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = 'ok'
-        mock_run.return_value.stderr = ''
+        mock_run.return_value = (0, '')
         jid = enqueue_ytdl('http://example.com/video')
         # Give background thread a moment to run
         import time
@@ -27,6 +26,43 @@ class TestJobs(unittest.TestCase):
         st = job_status(jid)
         self.assertIn(st['status'], ('done', 'failed', 'timeout', 'error'))
 
+    @patch('bot.jobs._downloader')
+    @patch('bot.jobs._executor')
+    @patch('bot.jobs.run_tail')
+    def test_done_job_uploads_job_dir_once(self, mock_run, mock_executor, mock_downloader):
+        mock_executor.submit.side_effect = lambda fn, *args, **kwargs: fn(*args, **kwargs)
+        mock_run.return_value = (0, '')
+        jid = enqueue_ytdl('http://example.com/video', chat_id=1)
+        mock_downloader.upload_local_file.assert_called_once()
+        args, kwargs = mock_downloader.upload_local_file.call_args
+        self.assertEqual(args[0], os.path.join('downloads', jid))
+        self.assertEqual(kwargs['chat_id'], 1)
+        self.assertEqual(job_status(jid)['status'], 'done')
+
+    @patch('bot.jobs._executor')
+    @patch('bot.jobs.run_tail')
+    def test_active_job_ids_tracks_running_jobs(self, mock_run, mock_executor):
+        seen = []
+        submitted = []
+        mock_executor.submit.side_effect = lambda fn, *args: submitted.append((fn, args))
+        def run(cmd, timeout=None):
+            seen.append(active_job_ids())
+            return (1, 'boom')
+        mock_run.side_effect = run
+        jid = enqueue_ytdl('http://example.com/video')
+        self.assertIn(jid, active_job_ids())
+        fn, args = submitted[0]
+        fn(*args)
+        self.assertIn(jid, seen[0])
+        self.assertNotIn(jid, active_job_ids())
+
+    @patch('bot.jobs._downloader', None)
+    @patch('bot.jobs._updater', None)
+    def test_set_updater_reuses_shared_downloader(self):
+        shared = Mock()
+        set_updater(Mock(), shared)
+        self.assertIs(bot.jobs._downloader, shared)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import Mock, patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telegram.error import RetryAfter
+
+from bot.main_bot import _cached_build, _chunk, _dispatch, _fmt_transfer, _reply_chunked, _rss_job, _sb_list_cached, sb_stop, sb_torrent
+
+
+class TestChunk(unittest.TestCase):
+    def test_short_text_single_chunk(self):
+        self.assertEqual(list(_chunk("a\nb", limit=10)), ["a\nb"])
+
+    def test_splits_on_line_boundaries(self):
+        text = "\n".join(["x" * 4] * 5)  # 24 chars
+        parts = list(_chunk(text, limit=10))
+        self.assertEqual(parts, ["xxxx\nxxxx", "xxxx\nxxxx", "xxxx"])
+        self.assertEqual("\n".join(parts), text)
+
+    def test_hard_split_without_newline(self):
+        self.assertEqual(list(_chunk("y" * 25, limit=10)), ["y" * 10, "y" * 10, "y" * 5])
+
+
+class TestReplyChunked(unittest.TestCase):
+    @patch('bot.main_bot.time.sleep')
+    def test_retries_after_flood_control(self, mock_sleep):
+        update = Mock()
+        update.message.reply_text.side_effect = [RetryAfter(2), None]
+        _reply_chunked(update, "hello")
+        self.assertEqual(update.message.reply_text.call_count, 2)
+        mock_sleep.assert_called_once_with(2)
+
+
+class TestDispatch(unittest.TestCase):
+    def _run(self, text):
+        handler = Mock()
+        update = Mock()
+        update.message.text = text
+        context = Mock()
+        context.bot.username = 'MyBot'
+        with patch.dict('bot.main_bot.CMD_TABLE', {'job': handler}):
+            _dispatch(update, context)
+        return handler, context
+
+    def test_routes_command_with_args(self):
+        handler, context = self._run('/job abc123')
+        handler.assert_called_once()
+        self.assertEqual(context.args, ['abc123'])
+
+    def test_accepts_own_bot_suffix(self):
+        handler, _ = self._run('/job@mybot abc')
+        handler.assert_called_once()
+
+    def test_ignores_other_bot_suffix(self):
+        handler, _ = self._run('/job@otherbot abc')
+        handler.assert_not_called()
+
+    def test_ignores_malformed_command(self):
+        handler, _ = self._run('/job-x abc')
+        handler.assert_not_called()
+
+    def test_rejects_unlisted_user(self):
+        with patch('bot.main_bot.ALLOWED_USER_IDS', frozenset({42})):
+            handler, _ = self._run('/job abc')
+        handler.assert_not_called()
+
+
+class TestCachedBuild(unittest.TestCase):
+    def setUp(self):
+        self.cache = {"t": 0.0, "value": None, "inflight": None}
+        self.lock = threading.Lock()
+
+    def test_concurrent_callers_share_one_build(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        def build():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "text"
+        results = []
+        first = threading.Thread(target=lambda: results.append(_cached_build(self.cache, self.lock, 2.0, build)))
+        first.start()
+        started.wait(5)
+        # The lock is free while the build runs; a second caller waits on it
+        self.assertFalse(self.lock.locked())
+        second = threading.Thread(target=lambda: results.append(_cached_build(self.cache, self.lock, 2.0, build)))
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(results, ["text", "text"])
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_build_not_cached(self):
+        build = Mock(side_effect=[RuntimeError("down"), "ok"])
+        with self.assertRaises(RuntimeError):
+            _cached_build(self.cache, self.lock, 2.0, build)
+        self.assertEqual(_cached_build(self.cache, self.lock, 2.0, build), "ok")
+        self.assertEqual(build.call_count, 2)
+
+
+class TestSbListCache(unittest.TestCase):
+    @patch('bot.main_bot._sb_list_cache', {"t": 0.0, "value": None, "inflight": None})
+    @patch('bot.main_bot.sb_client')
+    def test_state_change_invalidates_listing(self, mock_sb):
+        mock_sb.list_torrents.return_value = [{'hash': 'h1'}]
+        _sb_list_cached()
+        _sb_list_cached()
+        self.assertEqual(mock_sb.list_torrents.call_count, 1)
+
+        update, context = Mock(), Mock()
+        context.args = ['h1']
+        sb_stop(update, context)
+        _sb_list_cached()
+        self.assertEqual(mock_sb.list_torrents.call_count, 2)
+
+
+class TestSbTorrent(unittest.TestCase):
+    @patch('bot.main_bot.get_state')
+    @patch('bot.main_bot.sb_client')
+    def test_failed_add_clears_intent(self, mock_sb, mock_get_state):
+        mock_sb.add_torrent.side_effect = RuntimeError("rpc down")
+        update, context = Mock(), Mock()
+        update.effective_chat.id = 42
+        context.args = ['magnet:?xt=urn:btih:abcdef0123456789abcdef0123456789abcdef01']
+        sb_torrent(update, context)
+        state = mock_get_state.return_value
+        state.set_intent.assert_called_once_with('sb_ABCDEF0123456789ABCDEF0123456789ABCDEF01', 'telegram', chat_id=42)
+        state.clear_intent.assert_called_once_with('sb_ABCDEF0123456789ABCDEF0123456789ABCDEF01')
+
+
+class TestStatusFormatting(unittest.TestCase):
+    def test_transfer_entry(self):
+        task = {'name': 'my_file.mkv', 'status': 'uploading', 'progress_percent': 42.0,
+                'total_files': 3, 'uploaded_files': 1, 'start_time': 100}
+        self.assertEqual(_fmt_transfer(task, 130), "• `my\\_file.mkv`\n  └ Uploading (42.0%) | 1/3 files | 30s ago")
+
+    def test_long_name_truncated_without_progress(self):
+        task = {'name': 'x' * 40, 'status': 'queued', 'start_time': 0}
+        self.assertEqual(_fmt_transfer(task, 0), f"• `{'x' * 23}..`\n  └ Queued | 0s ago")
+
+
+class TestRssJob(unittest.TestCase):
+    def test_background_poll_sends_one_summary(self):
+        fm = Mock()
+        fm.run_due.side_effect = lambda on_decision: [on_decision('rd', {'title': t}) for t in ('a', 'b')]
+        context = Mock()
+        with patch('bot.main_bot.feed_manager', fm), \
+                patch('bot.main_bot.RSS_NOTIFY_CHAT', '123'), \
+                patch('bot.main_bot._add_feed_entry', side_effect=lambda b, e: [f"Route {e['title']} -> {b}"]):
+            _rss_job(context)
+        context.bot.send_message.assert_called_once_with('123', "📰 RSS\nRoute a -> rd\nRoute b -> rd")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import queue
 import unittest
 from unittest.mock import Mock, patch
 from bot.monitor import Monitor
@@ -5,6 +6,7 @@ from bot.monitor import Monitor
 class TestMonitor(unittest.TestCase):
     def setUp(self):
         self.downloader = Mock()
+        self.downloader.free_slots.return_value = 32
         self.rd = Mock()
         self.sb = Mock()
         self.monitor = Monitor(self.downloader, self.rd, self.sb)
@@ -12,18 +14,19 @@ class TestMonitor(unittest.TestCase):
         self.monitor.state = Mock()
         self.monitor.state.is_processed.return_value = False
         self.monitor.state.get_intent.return_value = None
+        self.monitor.state.get_intent_chat.return_value = None
 
     def test_check_realdebrid_downloaded(self):
         # Setup RD mock
         self.rd.list_torrents.return_value = [{'id': 't1', 'status': 'downloaded', 'filename': 'video.mp4'}]
         self.rd.get_torrent_info.return_value = {'links': ['http://host/file']}
-        self.rd.unrestrict_link.return_value = {'download': 'http://dl/video.mp4', 'filename': 'video.mp4'}
+        self.rd.unrestrict_link.return_value = {'download': 'http://dl/video.mp4', 'filename': 'video.mp4', 'filesize': 42}
 
         self.monitor.check_realdebrid()
 
         # Check interaction
-        self.rd.unrestrict_link.assert_called_with('http://host/file')
-        self.downloader.process_item.assert_called_with('http://dl/video.mp4', 'video.mp4', dest='telegram', chat_id=None)
+        self.rd.unrestrict_link.assert_called_with('http://host/file', remote=True)
+        self.downloader.process_item.assert_called_with('http://dl/video.mp4', 'video.mp4', dest='telegram', chat_id=None, size=42)
         self.monitor.state.add_processed.assert_called_with('rd_t1')
 
     def test_check_seedbox_finished(self):
@@ -32,7 +35,7 @@ class TestMonitor(unittest.TestCase):
         
         self.monitor.check_seedbox()
 
-        self.downloader.process_item.assert_called_with('sftp:///home/user/linux.iso', 'linux.iso', dest='telegram', chat_id=None)
+        self.downloader.process_item.assert_called_with('sftp:///home/user/linux.iso', 'linux.iso', dest='telegram', chat_id=None, size=100)
         self.monitor.state.add_processed.assert_called_with('sb_h1')
 
     def test_check_seedbox_gdrive_intent(self):
@@ -42,9 +45,37 @@ class TestMonitor(unittest.TestCase):
         
         self.monitor.check_seedbox()
 
-        self.downloader.process_item.assert_called_with('sftp:///home/user/linux.iso', 'linux.iso', dest='gdrive', chat_id=None)
+        self.downloader.process_item.assert_called_with('sftp:///home/user/linux.iso', 'linux.iso', dest='gdrive', chat_id=None, size=100)
         self.monitor.state.add_processed.assert_called_with('sb_h1')
 
+    def test_intent_chat_forwarded(self):
+        # The chat that queued the torrent gets the upload
+        self.sb.list_torrents.return_value = [{'name': 'linux.iso', 'hash': 'h1', 'size': 100, 'bytes_done': 100, 'base_path': '/home/user/linux.iso'}]
+        self.monitor.state.get_intent_chat.return_value = 42
+
+        self.monitor.check_seedbox()
+
+        self.monitor.state.get_intent_chat.assert_called_with('sb_h1')
+        self.downloader.process_item.assert_called_with('sftp:///home/user/linux.iso', 'linux.iso', dest='telegram', chat_id=42, size=100)
+
+    def test_full_queue_defers_rd_torrent(self):
+        self.rd.list_torrents.return_value = [{'id': 't1', 'status': 'downloaded', 'filename': 'pack'}]
+        self.rd.get_torrent_info.return_value = {'links': ['http://host/a', 'http://host/b']}
+        self.downloader.free_slots.return_value = 1
+
+        self.monitor.check_realdebrid()
+
+        self.downloader.process_item.assert_not_called()
+        self.monitor.state.add_processed.assert_not_called()
+
+    def test_full_queue_leaves_seedbox_torrent_unprocessed(self):
+        self.sb.list_torrents.return_value = [{'name': 'linux.iso', 'hash': 'h1', 'size': 100, 'bytes_done': 100, 'base_path': '/home/user/linux.iso'}]
+        self.downloader.process_item.side_effect = queue.Full
+
+        self.monitor.check_seedbox()
+
+        self.monitor.state.add_processed.assert_not_called()
+
     def test_check_seedbox_incomplete_ignored(self):
         self.sb.list_torrents.return_value = [{'name': 'linux.iso', 'hash': 'h1', 'size': 100, 'bytes_done': 50, 'base_path': '/home/user/linux.iso'}]
         self.monitor.check_seedbox()
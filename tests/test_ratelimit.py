@@ -0,0 +1,27 @@
+import os
+import sys
+import time
+import unittest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bot.utils.ratelimit import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.take()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_blocks_when_empty(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        bucket.take()
+        start = time.monotonic()
+        bucket.take()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,7 @@ class TestRDClient(unittest.TestCase):
             if old is not None:
                 os.environ['RD_ACCESS_TOKEN'] = old
 
-    @patch('bot.clients.realdebrid.requests.request')
+    @patch('bot.utils.http.requests.Session.request')
     def test_is_cached_true(self, mock_request):
         mock_resp = Mock()
         mock_resp.status_code = 200
@@ -28,7 +28,7 @@ class TestRDClient(unittest.TestCase):
         c = RDClient(access_token='x')
         self.assertTrue(c.is_cached('magnet:?xt=urn:btih:abcdef'))
 
-    @patch('bot.clients.realdebrid.requests.request')
+    @patch('bot.utils.http.requests.Session.request')
     def test_add_magnet_calls_api(self, mock_request):
         mock_resp = Mock()
         mock_resp.status_code = 200
@@ -40,7 +40,7 @@ class TestRDClient(unittest.TestCase):
         r = c.add_magnet('magnet:?xt=urn:btih:abc')
         self.assertEqual(r.get('id'), '123')
 
-    @patch('bot.clients.realdebrid.requests.request')
+    @patch('bot.utils.http.requests.Session.request')
     def test_delete_returns_true(self, mock_request):
         mock_resp = Mock()
         mock_resp.status_code = 204
@@ -50,6 +50,17 @@ class TestRDClient(unittest.TestCase):
         c = RDClient(access_token='x')
         self.assertTrue(c.delete_torrent('123'))
 
+    @patch('bot.utils.http.requests.Session.request')
+    def test_list_torrents_active_only_filters_server_side(self, mock_request):
+        mock_resp = Mock()
+        mock_resp.status_code = 200
+        mock_resp.ok = True
+        mock_resp.json.return_value = []
+        mock_request.return_value = mock_resp
+        c = RDClient(access_token='x')
+        c.list_torrents(active_only=True)
+        self.assertEqual(mock_request.call_args.kwargs['params']['filter'], 'active')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,14 @@
 import os
 import sys
+import threading
+import time
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from bot.rss import FeedManager, Router, FeedConfig
+import feedparser
+
+from bot.rss import FeedManager, Router, FeedConfig, MAX_POLL_INTERVAL, MIN_POLL_INTERVAL, _entry_gap, _publisher_interval
 
 
 class DummyRD:
@@ -45,5 +49,170 @@ class TestRSSRouting(unittest.TestCase):
         self.assertEqual(backend, 'sb')
 
 
+FEED_XML = b"""<rss><channel>
+<item><title>one</title><link>magnet:?xt=urn:btih:aaa</link></item>
+</channel></rss>"""
+
+
+class TestFeedPolling(unittest.TestCase):
+    def test_poll_once_fetches_via_session(self):
+        fm = FeedManager(Router(rd_client=DummyRD(cached=True)))
+        fm.state_manager = Mock()
+        fm.state_manager.is_seen.return_value = False
+        fm.state_manager.get_feed_validators.return_value = {}
+        resp = Mock(status_code=200, content=FEED_XML, headers={'Content-Type': 'application/rss+xml'}, url='http://x/feed')
+        fm.session = Mock()
+        fm.session.get.return_value = resp
+        fm.add_feed('http://x/feed')
+
+        decisions = []
+        fm.poll_once(on_decision=lambda backend, e: decisions.append((backend, e['link'])))
+
+        fm.session.get.assert_called_once()
+        self.assertEqual(decisions, [('rd', 'magnet:?xt=urn:btih:aaa')])
+
+    def test_not_modified_skips_parse(self):
+        fm = FeedManager(Router())
+        fm.state_manager = Mock()
+        fm.state_manager.get_feed_validators.return_value = {'etag': '"v1"'}
+        fm.session = Mock()
+        fm.session.get.return_value = Mock(status_code=304, headers={})
+        fm.add_feed('http://x/feed')
+
+        decisions = []
+        fm.poll_once(on_decision=lambda backend, e: decisions.append(backend))
+
+        self.assertEqual(fm.session.get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(decisions, [])
+        fm.state_manager.set_feed_validators.assert_not_called()
+
+    def test_not_modified_refreshes_rotated_etag(self):
+        fm = FeedManager(Router())
+        fm.state_manager = Mock()
+        fm.state_manager.get_feed_validators.return_value = {'etag': '"v1"', 'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+        fm.session = Mock()
+        fm.session.get.return_value = Mock(status_code=304, headers={'ETag': '"v2"'})
+        fm.add_feed('http://x/feed')
+
+        self.assertEqual(fm.poll_feed('http://x/feed'), 0)
+        fm.state_manager.set_feed_validators.assert_called_once_with(
+            'http://x/feed', {'etag': '"v2"', 'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+
+    def test_identical_body_skips_parse(self):
+        fm = FeedManager(Router())
+        fm.state_manager = Mock()
+        fm.state_manager.is_seen.return_value = True
+        fm.state_manager.get_feed_validators.return_value = {}
+        fm.session = Mock()
+        fm.session.get.return_value = Mock(status_code=200, content=FEED_XML, headers={}, url='http://x/feed')
+        fm.add_feed('http://x/feed')
+
+        with patch('bot.rss.feedparser.parse', wraps=feedparser.parse) as parse:
+            fm.poll_feed('http://x/feed')
+            fm.poll_feed('http://x/feed')
+        parse.assert_called_once()
+
+    def test_head_first_when_conditional_get_ignored(self):
+        fm = FeedManager(Router())
+        fm.state_manager = Mock()
+        fm.state_manager.is_seen.return_value = True
+        fm.state_manager.get_feed_validators.return_value = {'etag': '"v1"'}
+        fm.session = Mock()
+        fm.session.get.return_value = Mock(status_code=200, content=FEED_XML, headers={'ETag': '"v1"'}, url='http://x/feed')
+        fm.session.head.return_value = Mock(status_code=200, ok=True, headers={'ETag': '"v1"'})
+        fm.add_feed('http://x/feed')
+
+        fm.poll_feed('http://x/feed')
+        fm.session.head.assert_not_called()
+        self.assertEqual(fm.poll_feed('http://x/feed'), 0)
+        fm.session.head.assert_called_once()
+        fm.session.get.assert_called_once()
+
+
+class TestAdaptiveSchedule(unittest.TestCase):
+    def setUp(self):
+        self.fm = FeedManager(Router())
+        self.fm.add_feed('http://x/feed')
+
+    def test_backoff_doubles_and_halves(self):
+        delays = [self.fm._next_delay('http://x/feed', n, 100) for n in (0, 0, 0, 0, 0)]
+        self.assertEqual(delays, [200, 400, 800, 800, 800])
+        delays = [self.fm._next_delay('http://x/feed', 3, 100) for _ in range(4)]
+        self.assertEqual(delays, [400, 200, 100, 100])
+
+    def test_busy_feed_speeds_up_to_floor(self):
+        delays = [self.fm._next_delay('http://x/feed', 5, 3600) for _ in range(4)]
+        self.assertEqual(delays, [1800, 900, 900, 900])
+        self.assertEqual(self.fm._next_delay('http://y/feed', 5, 600), MIN_POLL_INTERVAL)
+
+    def test_ttl_raises_base_interval(self):
+        self.fm._ttl['http://x/feed'] = 3600
+        self.assertEqual(self.fm._next_delay('http://x/feed', 1, 600), 3600)
+
+    def test_same_host_feeds_polled_in_sequence(self):
+        self.fm.add_feed('http://X/other')
+        threads = {}
+        def poll(url, cb):
+            threads[url] = threading.current_thread()
+            return 0
+        self.fm.poll_feed = Mock(side_effect=poll)
+        self.fm.run_due(600)
+        self.assertIs(threads['http://x/feed'], threads['http://X/other'])
+
+    def test_interval_capped_at_one_day(self):
+        self.fm._ttl['http://x/feed'] = 7 * 86400
+        self.assertEqual(self.fm._next_delay('http://x/feed', 1, 600), MAX_POLL_INTERVAL)
+
+    def test_entry_gap_sets_base_interval(self):
+        now = time.time()
+        entries = [{'published_parsed': time.gmtime(now - i * 3600)} for i in range(4)]
+        entries.append({'published_parsed': time.gmtime(now - 30 * 86400)})  # outside the window
+        self.assertEqual(_entry_gap(entries, now), 3600)
+        self.fm._gap['http://x/feed'] = 3600
+        self.assertEqual(self.fm._next_delay('http://x/feed', 0, 600), 7200)
+
+    def test_publisher_interval_hints(self):
+        d = feedparser.parse(b"""<rss xmlns:sy="http://purl.org/rss/1.0/modules/syndication/"><channel>
+<sy:updatePeriod>daily</sy:updatePeriod><sy:updateFrequency>4</sy:updateFrequency>
+</channel></rss>""", response_headers={'cache-control': 'public, max-age=300'})
+        self.assertEqual(_publisher_interval(d), 86400 // 4)
+
+    def test_run_due_polls_each_feed_once_until_due(self):
+        self.fm.poll_feed = Mock(return_value=1)
+        self.fm.run_due(600)
+        self.fm.run_due(600)
+        self.fm.poll_feed.assert_called_once()
+
+    def test_run_due_fetches_feeds_concurrently(self):
+        self.fm.add_feed('http://y/feed')
+        barrier = threading.Barrier(2, timeout=5)
+        # Both polls must be in flight at once for the barrier to release
+        self.fm.poll_feed = Mock(side_effect=lambda url, cb: barrier.wait() and 0)
+        self.fm.run_due(600)
+        self.assertEqual(self.fm.poll_feed.call_count, 2)
+        self.assertFalse(barrier.broken)
+
+    def test_remove_feed_drops_per_feed_state(self):
+        url = 'http://x/feed'
+        self.fm._backoff[url] = 8
+        self.fm._ttl[url] = 3600
+        self.fm._gap[url] = 7200
+        self.fm._body_hash[url] = b'h'
+        self.fm._head_first.add(url)
+        self.fm.remove_feed(url)
+        self.fm.add_feed(url)
+        self.assertEqual(self.fm._next_delay(url, None, 600), 1200)
+        self.assertNotIn(url, self.fm._body_hash)
+        self.assertNotIn(url, self.fm._head_first)
+
+    def test_list_feeds_cached_until_changed(self):
+        first = self.fm.list_feeds()
+        self.assertIs(self.fm.list_feeds(), first)
+        self.fm.add_feed('http://y/feed')
+        self.assertEqual([f.url for f in self.fm.list_feeds()], ['http://x/feed', 'http://y/feed'])
+        self.fm.remove_feed('http://x/feed')
+        self.assertEqual([f.url for f in self.fm.list_feeds()], ['http://y/feed'])
+
+
 if __name__ == '__main__':
     unittest.main()
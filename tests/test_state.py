@@ -1,18 +1,20 @@
 import unittest
 import os
 import shutil
-from bot.state import JsonFileState
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from bot.state import JsonFileState, JOB_TTL
 
 class TestJsonState(unittest.TestCase):
     def setUp(self):
-        self.filename = "test_state.tmp.json"
-        if os.path.exists(self.filename):
-            os.remove(self.filename)
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "state.json")
         self.state = JsonFileState(self.filename)
 
     def tearDown(self):
-        if os.path.exists(self.filename):
-            os.remove(self.filename)
+        shutil.rmtree(self.tmpdir)
 
     def test_seen_logic(self):
         url = "http://feed.com"
@@ -24,6 +26,27 @@ class TestJsonState(unittest.TestCase):
         new_state = JsonFileState(self.filename)
         self.assertTrue(new_state.is_seen(url, "123"))
 
+    def test_processed_persists_as_set(self):
+        self.state.add_processed("abc")
+        self.state.add_processed("abc")
+        new_state = JsonFileState(self.filename)
+        self.assertTrue(new_state.is_processed("abc"))
+        self.assertEqual(new_state.data["processed"], {"abc"})
+
+    def test_intent_keeps_chat_id(self):
+        self.state.set_intent("rd_1", "gdrive", chat_id=42)
+        self.state.set_intent("rd_2", "telegram")
+        new_state = JsonFileState(self.filename)
+        self.assertEqual(new_state.get_intent("rd_1"), "gdrive")
+        self.assertEqual(new_state.get_intent_chat("rd_1"), 42)
+        self.assertIsNone(new_state.get_intent_chat("rd_2"))
+
+    def test_clear_intent(self):
+        self.state.set_intent("sb_1", "gdrive", chat_id=42)
+        self.state.clear_intent("sb_1")
+        self.assertIsNone(self.state.get_intent("sb_1"))
+        self.assertIsNone(JsonFileState(self.filename).get_intent_chat("sb_1"))
+
     def test_job_logic(self):
         jid = "job1"
         data = {"status": "ok"}
@@ -33,5 +56,41 @@ class TestJsonState(unittest.TestCase):
         new_state = JsonFileState(self.filename)
         self.assertEqual(new_state.get_job(jid), data)
 
+    def test_job_reads_are_copies(self):
+        self.state.set_job("job1", {"status": "queued"})
+        self.state.get_job("job1")["status"] = "running"
+        self.assertEqual(self.state.get_job("job1")["status"], "queued")
+
+    def test_finished_jobs_expire(self):
+        old = time.time() - JOB_TTL - 10
+        with patch('bot.state.time.time', return_value=old):
+            self.state.set_job("old", {"status": "done"})
+            self.state.set_job("stuck", {"status": "running"})
+        self.state.set_job("new", {"status": "done"})
+        jobs = JsonFileState(self.filename).list_jobs()
+        self.assertNotIn("old", jobs)
+        self.assertIn("stuck", jobs)
+        self.assertIn("new", jobs)
+
+    def test_feed_validators_persist(self):
+        url = "http://feed.com"
+        self.assertEqual(self.state.get_feed_validators(url), {})
+        self.state.set_feed_validators(url, {"etag": '"abc"'})
+        self.assertEqual(JsonFileState(self.filename).get_feed_validators(url), {"etag": '"abc"'})
+
+    def test_concurrent_writes_are_not_lost(self):
+        url = "http://feed.com"
+        threads = [
+            threading.Thread(target=lambda n=n: [self.state.add_seen(url, f"{n}-{i}") for i in range(20)])
+            for n in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        reloaded = JsonFileState(self.filename)
+        self.assertEqual(len(reloaded.data["seen"][url]), 160)
+        self.assertFalse(os.path.exists(self.filename + ".tmp"))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,23 @@
+import os
+import sys
+import subprocess
+import unittest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bot.utils.subproc import run_tail
+
+
+class TestRunTail(unittest.TestCase):
+    def test_keeps_only_last_lines(self):
+        code = "import sys\nfor i in range(200): print(i, file=sys.stderr)\nsys.exit(3)"
+        returncode, tail = run_tail([sys.executable, '-c', code], tail_lines=5)
+        self.assertEqual(returncode, 3)
+        self.assertEqual(tail.split(), ['195', '196', '197', '198', '199'])
+
+    def test_timeout_kills_process(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_tail([sys.executable, '-c', 'import time; time.sleep(30)'], timeout=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()